@@ -0,0 +1,159 @@
+"""In-process admission control for the AI endpoints.
+
+Every priority class has its own per-user token buckets and, optionally, a
+concurrency limit. Classes never share capacity, so a flood of image
+detections cannot starve ``/ai/detect`` or the health checks. Rejections are
+immediate (or after a short bounded wait) and carry a Retry-After header.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict
+
+from fastapi import Depends, HTTPException
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated = now
+
+
+class RateLimiter:
+    """Token bucket per key, bounded to ``max_keys`` least recently used keys."""
+
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int = 100_000):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst)
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    def acquire(self, key: str, now: float = None) -> float:
+        """Take one token for ``key``; return 0 on success or seconds to wait."""
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.capacity, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(self.capacity, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0.0
+        if self.rate <= 0:
+            return math.inf
+        return (1 - bucket.tokens) / self.rate
+
+
+class ConcurrencyLimiter:
+    """Bounded number of in-flight requests with an estimate of the wait time.
+
+    A plain counter rather than an ``asyncio.Semaphore`` so it is not bound
+    to one event loop; waiting for a slot polls for at most ``queue_timeout``.
+    """
+
+    POLL_INTERVAL = 0.01
+
+    def __init__(self, limit: int, queue_timeout: float = 0.0):
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        # Moving average of how long a slot is held, used for Retry-After
+        self._service_time = 1.0
+
+    def retry_after(self) -> float:
+        return self._service_time
+
+    async def acquire(self) -> bool:
+        deadline = time.monotonic() + self.queue_timeout
+        while self.in_flight >= self.limit:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(self.POLL_INTERVAL)
+        self.in_flight += 1
+        return True
+
+    def release(self, held: float):
+        self._service_time = 0.8 * self._service_time + 0.2 * held
+        self.in_flight -= 1
+
+
+def _retry_after(seconds: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(min(seconds, 3600))))}
+
+
+class PriorityClass:
+    """Admission policy for one group of endpoints.
+
+    ``dependency`` builds the FastAPI dependency; it shares the
+    ``verify_token`` result with the endpoint, so the user is keyed on the
+    email returned by auth-service::
+
+        inference = PriorityClass("inference", rate_per_minute=10, burst=5, max_concurrency=2)
+
+        @app.post("/ai/detect-image")
+        async def detect_image(..., user=Depends(verify_token),
+                               _=Depends(inference.dependency(verify_token))):
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, burst: int,
+                 max_concurrency: int = 0, queue_timeout: float = 0.0):
+        self.name = name
+        self.rate_limiter = RateLimiter(rate_per_minute, burst) if rate_per_minute > 0 else None
+        self.concurrency = ConcurrencyLimiter(max_concurrency, queue_timeout) if max_concurrency > 0 else None
+        self.rejected = {"rate_limited": 0, "over_capacity": 0}
+
+    def check_rate(self, user: dict):
+        if self.rate_limiter is None:
+            return
+        wait = self.rate_limiter.acquire(user.get("email") or "anonymous")
+        if wait:
+            self.rejected["rate_limited"] += 1
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit exceeded for {self.name} requests",
+                headers=_retry_after(wait),
+            )
+
+    async def acquire_slot(self) -> float:
+        """Take a concurrency slot and return the start time, or reject."""
+        if not await self.concurrency.acquire():
+            self.rejected["over_capacity"] += 1
+            raise HTTPException(
+                status_code=503,
+                detail=f"Too many concurrent {self.name} requests",
+                headers=_retry_after(self.concurrency.retry_after()),
+            )
+        return time.monotonic()
+
+    def unavailable(self, detail: str) -> HTTPException:
+        """503 for a request admitted here that could not be served in time."""
+        retry = self.concurrency.retry_after() if self.concurrency else 1
+        return HTTPException(status_code=503, detail=detail, headers=_retry_after(retry))
+
+    def dependency(self, verify):
+        async def admit(user=Depends(verify)):
+            self.check_rate(user)
+            if self.concurrency is None:
+                yield
+                return
+            start = await self.acquire_slot()
+            try:
+                yield
+            finally:
+                self.concurrency.release(time.monotonic() - start)
+
+        return admit
+
+    def status(self) -> dict:
+        return {
+            "in_flight": self.concurrency.in_flight if self.concurrency else None,
+            "limit": self.concurrency.limit if self.concurrency else None,
+            "rejected": dict(self.rejected),
+        }
@@ -0,0 +1,73 @@
+"""Annotation cost vs number of detections.
+
+Compares the per-request supervision annotators previously used by
+``detect_image`` against the shared ``DetectionAnnotator``. Timings include
+the JPEG encode of the result, which is where the downscaled output pays off.
+
+Run from backend/ai-service:  python benchmarks/bench_annotate.py
+"""
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import supervision as sv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from yolo_detector.annotate import get_annotator  # noqa: E402
+
+CLASS_NAMES = ["tomato", "egg", "onion", "garlic", "carrot", "potato", "chicken", "beef"]
+IMAGE_SHAPE = (2160, 3840, 3)
+REPEATS = 10
+
+
+def make_detections(n: int, rng: np.random.Generator) -> sv.Detections:
+    h, w = IMAGE_SHAPE[:2]
+    xy = rng.uniform(0, [w - 200, h - 200], size=(n, 2))
+    wh = rng.uniform(20, 200, size=(n, 2))
+    class_id = rng.integers(0, len(CLASS_NAMES), size=n)
+    return sv.Detections(
+        xyxy=np.hstack([xy, xy + wh]).astype(np.float32),
+        confidence=rng.uniform(0.3, 1.0, size=n).astype(np.float32),
+        class_id=class_id,
+        data={"class_name": np.array([CLASS_NAMES[i] for i in class_id])},
+    )
+
+
+def baseline(image, detections):
+    scene = sv.BoxAnnotator().annotate(scene=image, detections=detections)
+    return sv.LabelAnnotator().annotate(scene=scene, detections=detections)
+
+
+def timed(fn, image, detections):
+    best = float("inf")
+    for _ in range(REPEATS):
+        scene = image.copy()
+        start = time.perf_counter()
+        cv2.imencode(".jpg", fn(scene, detections))
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 255, size=IMAGE_SHAPE, dtype=np.uint8)
+    full = get_annotator(max_side=0)
+    capped = get_annotator(max_side=1280)
+
+    print(f"image {IMAGE_SHAPE[1]}x{IMAGE_SHAPE[0]}, best of {REPEATS} (ms)")
+    print(f"{'detections':>10} {'baseline':>10} {'cached':>10} {'cached@1280':>12}")
+    for n in (0, 1, 10, 50, 200, 1000):
+        detections = make_detections(n, rng)
+        labels = detections.data["class_name"].tolist()
+        base_ms = timed(baseline, image, detections)
+        full_ms = timed(lambda s, d: full.annotate(s, d, labels), image, detections)
+        capped_ms = timed(lambda s, d: capped.annotate(s, d, labels), image, detections)
+        print(f"{n:>10} {base_ms:>10.2f} {full_ms:>10.2f} {capped_ms:>12.2f}")
+    print(f"label cache: {full.label_cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Per-request logging overhead: synchronous handler vs the queue-based setup.
+
+A simulated request emits the records a detection request produces at
+DEBUG: a burst of chatty third-party lines plus a few application lines.
+The sink imitates a container log pipe where each write costs
+``WRITE_COST`` seconds. Only the time spent in the calling thread is
+measured, since that is what blocks the event loop.
+
+Run from backend/ai-service:  python benchmarks/bench_logging.py
+"""
+import io
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import log_config  # noqa: E402
+
+REQUESTS = 2000
+CHATTY_LINES = 20
+APP_LINES = 3
+WRITE_COST = 20e-6
+
+
+class SlowSink(io.StringIO):
+    def write(self, text):
+        time.sleep(WRITE_COST)
+        return super().write(text)
+
+
+def simulate_requests() -> float:
+    chatty = logging.getLogger("inference.models")
+    app = logging.getLogger("main")
+    start = time.perf_counter()
+    for i in range(REQUESTS):
+        for j in range(CHATTY_LINES):
+            chatty.debug("Preprocessed tile %s of request %s", j, i)
+        for _ in range(APP_LINES):
+            app.info("Detected %d ingredients", 3)
+    return (time.perf_counter() - start) / REQUESTS
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    logging.getLogger("inference").setLevel(logging.NOTSET)
+
+
+def main():
+    print(f"{REQUESTS} requests x {CHATTY_LINES + APP_LINES} log calls, sink write cost {WRITE_COST * 1e6:.0f} us")
+
+    reset_root()
+    logging.basicConfig(level=logging.DEBUG, stream=SlowSink(),
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+    print(f"{'basicConfig(DEBUG), sync':>36}: {simulate_requests() * 1e6:9.1f} us/request")
+
+    for level, rate_limits in (("DEBUG", "inference=5"), ("INFO", "")):
+        reset_root()
+        log_config.setup_logging(level, "json", rate_limits=rate_limits, stream=SlowSink())
+        if level == "DEBUG":
+            # NOISY_LOGGERS caps inference at INFO; let DEBUG through to exercise the rate limit
+            logging.getLogger("inference").setLevel(logging.DEBUG)
+        label = f"queue, {level}" + (f", limit {rate_limits}" if rate_limits else "")
+        print(f"{label:>36}: {simulate_requests() * 1e6:9.1f} us/request")
+        log_config.shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Recipe recommendation latency on a synthetic 100k recipe corpus.
+
+Builds an index into a temporary directory, loads it memory-mapped and
+times top-k queries for ingredient sets typical of a detection.
+
+Run from backend/ai-service:  python benchmarks/bench_recommend.py [--recipes N]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommender import Recommender, build_index  # noqa: E402
+
+VOCAB = 3000
+QUERIES = 1000
+
+
+def write_corpus(path: str, recipes: int, rng: np.random.Generator):
+    # Zipf-like popularity so common ingredients have long posting lists
+    weights = 1.0 / np.arange(1, VOCAB + 1)
+    weights /= weights.sum()
+    with open(path, "w") as f:
+        for i in range(recipes):
+            ingredients = rng.choice(VOCAB, size=rng.integers(4, 15), replace=False, p=weights)
+            f.write(json.dumps({"id": i, "title": f"recipe {i}",
+                                "ingredients": [f"ingredient {j}" for j in ingredients]}) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = os.path.join(tmp, "recipes.jsonl")
+        write_corpus(corpus, args.recipes, rng)
+
+        start = time.perf_counter()
+        build_index(corpus, os.path.join(tmp, "index"))
+        print(f"build {args.recipes} recipes: {time.perf_counter() - start:.2f} s")
+
+        recommender = Recommender(os.path.join(tmp, "index"))
+        start = time.perf_counter()
+        recommender.reload()
+        print(f"load (mmap): {(time.perf_counter() - start) * 1000:.2f} ms")
+
+        for size in (1, 3, 8):
+            queries = [[f"ingredient {j}" for j in rng.integers(0, 200, size=size)] for _ in range(QUERIES)]
+            timings = []
+            for query in queries:
+                start = time.perf_counter()
+                recommender.recommend(query, args.top_k)
+                timings.append(time.perf_counter() - start)
+            p50, p99 = np.percentile(timings, [50, 99]) * 1000
+            print(f"{size} ingredients: p50 {p50:.3f} ms  p99 {p99:.3f} ms")
+        print(recommender.recommend(queries[0], 3))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Shared-memory frame handoff vs pickled transfer.
+
+Both paths send a decoded frame to a worker process that touches every
+pixel and returns a small result. The pickled path mirrors a plain process
+pool that ships the frame to the worker and the processed frame back.
+
+Run from backend/ai-service:  python benchmarks/bench_shm_transport.py
+"""
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shm_transport import FrameWorkerPool  # noqa: E402
+
+REQUESTS = 50
+SHAPES = {"1080p": (1080, 1920, 3), "4K": (2160, 3840, 3)}
+
+
+def process_frame(frame):
+    # Stand-in for inference + annotation in place: touch every pixel
+    np.bitwise_not(frame, out=frame)
+    return b"x" * 64_000, {"mean": float(frame[::64, ::64].mean())}
+
+
+def pickled_worker(inbox, outbox):
+    while True:
+        frame = inbox.get()
+        if frame is None:
+            break
+        process_frame(frame)
+        outbox.put(frame)
+
+
+def bench_pickled(shape) -> float:
+    ctx = mp.get_context("spawn")
+    inbox, outbox = ctx.Queue(), ctx.Queue()
+    worker = ctx.Process(target=pickled_worker, args=(inbox, outbox), daemon=True)
+    worker.start()
+    frame = np.random.default_rng(0).integers(0, 255, size=shape, dtype=np.uint8)
+    inbox.put(frame)
+    outbox.get()  # start-up
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        inbox.put(frame)
+        outbox.get()
+    elapsed = time.perf_counter() - start
+    inbox.put(None)
+    worker.join()
+    return elapsed / REQUESTS
+
+
+def bench_shared(shape) -> float:
+    pool = FrameWorkerPool(process_frame, workers=1, slots=2, slot_bytes=int(np.prod(shape))).start()
+    frame = np.random.default_rng(0).integers(0, 255, size=shape, dtype=np.uint8)
+    try:
+        pool.submit(frame).result()  # start-up
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            pool.submit(frame).result()
+        return (time.perf_counter() - start) / REQUESTS
+    finally:
+        pool.stop()
+
+
+def main():
+    print(f"mean round trip over {REQUESTS} requests (ms)")
+    print(f"{'frame':>6} {'MB':>6} {'pickled':>9} {'shared':>9}")
+    for name, shape in SHAPES.items():
+        mb = np.prod(shape) / 1e6
+        print(f"{name:>6} {mb:>6.1f} {bench_pickled(shape) * 1000:>9.2f} {bench_shared(shape) * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
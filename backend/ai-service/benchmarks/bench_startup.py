@@ -0,0 +1,69 @@
+"""Import and start-up time of ai-service.
+
+Each measurement runs in a fresh interpreter so module caches do not skew
+the numbers. With ``--warm-up`` the model is loaded (from MODEL_CACHE_DIR
+when already cached) and one synthetic inference is run; needs
+ROBOFLOW_API_KEY.
+
+Run from backend/ai-service:  python benchmarks/bench_startup.py [--warm-up]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPEATS = 3
+
+SNIPPETS = {
+    "import main (lazy)": "import main",
+    "import heavy modules": "import cv2, supervision, inference",
+}
+
+WARM_UP = """
+import json, time
+start = time.perf_counter()
+import main
+from yolo_detector import engine
+engine.stats["import_main_s"] = round(time.perf_counter() - start, 4)
+engine.warm_up()
+engine.stats["ready_after_s"] = round(time.perf_counter() - start, 4)
+print(json.dumps(engine.stats))
+"""
+
+
+def run(code: str) -> float:
+    timer = f"import time; _s = time.perf_counter()\n{code}\nprint(time.perf_counter() - _s)"
+    out = subprocess.run([sys.executable, "-c", timer], cwd=SERVICE_DIR, check=True,
+                         capture_output=True, text=True, env={**os.environ, "WARMUP_ON_STARTUP": "false"})
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--warm-up", action="store_true", help="also load the model and run a warm-up inference")
+    args = parser.parse_args()
+
+    print(f"best of {REPEATS} fresh interpreters (ms)")
+    for name, code in SNIPPETS.items():
+        try:
+            best = min(run(code) for _ in range(REPEATS))
+            print(f"{name:>22}: {best * 1000:8.1f}")
+        except subprocess.CalledProcessError as e:
+            print(f"{name:>22}: failed ({e.stderr.strip().splitlines()[-1]})")
+
+    if args.warm_up:
+        out = subprocess.run([sys.executable, "-c", WARM_UP], cwd=SERVICE_DIR, check=True,
+                             capture_output=True, text=True, env={**os.environ, "WARMUP_ON_STARTUP": "false"})
+        stats = json.loads(out.stdout.strip().splitlines()[-1])
+        # Timings end in _s; other entries (model_variant, errors, counts) are printed as is
+        for key, value in stats.items():
+            if key.endswith("_s") and isinstance(value, (int, float)):
+                print(f"{key:>22}: {value * 1000:8.1f}")
+            else:
+                print(f"{key:>22}: {value}")
+
+
+if __name__ == "__main__":
+    main()
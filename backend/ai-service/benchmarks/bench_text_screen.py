@@ -0,0 +1,71 @@
+"""Text screening throughput at 10, 1k and 100k keywords.
+
+Compares the compiled matcher with the previous per-keyword substring scan
+(``keyword in text`` for every keyword), which is skipped where it would
+take too long.
+
+Run from backend/ai-service:  python benchmarks/bench_text_screen.py
+"""
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_screen import KeywordClassifier  # noqa: E402
+
+MESSAGES = 2000
+MESSAGE_LENGTH = 280
+NAIVE_BUDGET = 10_000 * MESSAGES  # keyword x message pairs
+
+
+def random_word(rng: random.Random, low: int = 4, high: int = 12) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(low, high)))
+
+
+def make_messages(rng: random.Random, keywords: list) -> list:
+    messages = []
+    for _ in range(MESSAGES):
+        words = []
+        while sum(len(w) + 1 for w in words) < MESSAGE_LENGTH:
+            words.append(rng.choice(keywords) if rng.random() < 0.02 else random_word(rng, 2, 8))
+        messages.append(" ".join(words))
+    return messages
+
+
+def naive(keywords: list, messages: list) -> int:
+    hits = 0
+    for text in messages:
+        text_lower = text.lower()
+        hits += sum(1 for keyword in keywords if keyword in text_lower)
+    return hits
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{MESSAGES} messages of ~{MESSAGE_LENGTH} chars")
+    print(f"{'keywords':>9} {'compile ms':>11} {'compiled msg/s':>15} {'naive msg/s':>12}")
+    for count in (10, 1_000, 100_000):
+        keywords = list({random_word(rng) for _ in range(count)})
+        messages = make_messages(rng, keywords)
+
+        start = time.perf_counter()
+        classifier = KeywordClassifier({"spam": keywords})
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        classifier.classify_many(messages)
+        compiled_rate = MESSAGES / (time.perf_counter() - start)
+
+        naive_rate = "skipped"
+        if count * MESSAGES <= NAIVE_BUDGET:
+            start = time.perf_counter()
+            naive(keywords, messages)
+            naive_rate = f"{MESSAGES / (time.perf_counter() - start):.0f}"
+        print(f"{count:>9} {compile_ms:>11.1f} {compiled_rate:>15.0f} {naive_rate:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Single-pass vs tiled inference: cost and recall.
+
+Usage (from backend/ai-service):
+
+    python benchmarks/bench_tiling.py                      # merge/NMS cost only
+    python benchmarks/bench_tiling.py --images data/val    # + model cost and recall
+
+With ``--images``, every ``<name>.jpg`` may have a YOLO label file
+``<name>.txt`` (``class cx cy w h``, normalised) next to it; recall is the
+fraction of labelled boxes matched by a prediction at IoU >= 0.5. The model
+is loaded with ``get_model`` and needs ROBOFLOW_API_KEY.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from yolo_detector.metrics import load_yolo_labels  # noqa: E402
+from yolo_detector.tiling import box_iou, nms, slice_image  # noqa: E402
+
+
+def load_labels(image_path: str, shape) -> np.ndarray:
+    h, w = shape[:2]
+    return load_yolo_labels(os.path.splitext(image_path)[0] + ".txt", w, h)[1]
+
+
+def recall(predicted: np.ndarray, truth: np.ndarray, iou: float = 0.5) -> tuple:
+    if len(truth) == 0:
+        return 0, 0
+    if len(predicted) == 0:
+        return 0, len(truth)
+    matched = (box_iou(truth, predicted) >= iou).any(axis=1)
+    return int(matched.sum()), len(truth)
+
+
+def bench_merge(tile_size: int, overlap: float):
+    rng = np.random.default_rng(0)
+    image = np.zeros((3024, 4032, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    tiles, _ = slice_image(image, tile_size, overlap)
+    slice_ms = (time.perf_counter() - start) * 1000
+    print(f"slicing 4032x3024 into {len(tiles)} tiles: {slice_ms:.3f} ms "
+          f"(views share memory: {all(np.shares_memory(t, image) for t in tiles)})")
+    for n in (100, 1000, 3000):
+        xy = rng.uniform(0, 3800, size=(n, 2))
+        xyxy = np.hstack([xy, xy + rng.uniform(10, 200, size=(n, 2))])
+        scores = rng.uniform(size=n)
+        classes = rng.integers(0, 20, size=n)
+        start = time.perf_counter()
+        keep = nms(xyxy, scores, classes)
+        print(f"nms over {n:>5} boxes: {(time.perf_counter() - start) * 1000:8.2f} ms, kept {len(keep)}")
+
+
+def bench_model(image_dir: str, tile_size: int, overlap: float, workers: int, batch: bool):
+    import supervision as sv
+    from inference import get_model
+
+    from config import YOLO_MODEL_DETECTOR
+    from yolo_detector.tiling import infer_tiled
+
+    model = get_model(model_id=YOLO_MODEL_DETECTOR)
+    paths = sorted(glob.glob(os.path.join(image_dir, "*.jpg")) + glob.glob(os.path.join(image_dir, "*.png")))
+    totals = {"single": [0.0, 0, 0], "tiled": [0.0, 0, 0]}
+
+    for path in paths:
+        image = cv2.imread(path)
+        truth = load_labels(path, image.shape)
+
+        start = time.perf_counter()
+        single = sv.Detections.from_inference(model.infer(image)[0])
+        single_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tiled = infer_tiled(model, image, tile_size=tile_size, overlap=overlap,
+                            workers=workers, batch=batch)
+        tiled_s = time.perf_counter() - start
+
+        for name, detections, seconds in (("single", single, single_s), ("tiled", tiled, tiled_s)):
+            hit, count = recall(detections.xyxy, truth)
+            totals[name][0] += seconds
+            totals[name][1] += hit
+            totals[name][2] += count
+
+    print(f"{len(paths)} images, tile {tile_size}px, overlap {overlap}, "
+          f"{'batch' if batch else f'{workers} workers'}")
+    for name, (seconds, hit, count) in totals.items():
+        mean_ms = seconds / max(len(paths), 1) * 1000
+        rec = f"{hit / count:.3f}" if count else "n/a"
+        print(f"{name:>7}: {mean_ms:8.1f} ms/image  recall {rec} ({hit}/{count})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="directory with images (and optional YOLO labels)")
+    parser.add_argument("--tile-size", type=int, default=640)
+    parser.add_argument("--overlap", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch", action="store_true")
+    args = parser.parse_args()
+
+    bench_merge(args.tile_size, args.overlap)
+    if args.images:
+        bench_model(args.images, args.tile_size, args.overlap, args.workers, args.batch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Accuracy and latency of the optimized model variants.
+
+Every variant (see yolo_detector/optimize.py) runs over the same images.
+Variants are built into MODEL_CACHE_DIR first if needed. Reported per
+variant:
+
+* file size and build/load time;
+* per-image latency percentiles of ``model.infer`` (single image, no tiling);
+* ``vs_stock``: mAP@0.5 of the variant's boxes scored against the stock
+  model's boxes, i.e. how closely it reproduces the stock output;
+* with YOLO labels next to the images, precision, recall and mAP against
+  the labels.
+
+Usage (from backend/ai-service; needs ROBOFLOW_API_KEY):
+
+    python benchmarks/bench_variants.py --images data/val --report variants.json
+    python benchmarks/bench_variants.py --variants stock,int8 --calibration data/calib
+
+Without ``--images``, random images measure latency only.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Variants are applied explicitly below; load the stock weights
+os.environ["MODEL_VARIANT"] = "stock"
+
+from bulk_detect import list_directory, percentiles  # noqa: E402
+from config import MODEL_CACHE_DIR, YOLO_MODEL_DETECTOR  # noqa: E402
+from yolo_detector import engine  # noqa: E402
+from yolo_detector.metrics import DetectionEvaluator, load_yolo_labels  # noqa: E402
+from yolo_detector.optimize import VARIANTS, apply_variant  # noqa: E402
+
+WARM_UP_RUNS = 3
+
+
+def load_images(image_dir: str, limit: int):
+    import cv2
+
+    if not image_dir:
+        rng = np.random.default_rng(0)
+        return [(f"random-{i}", rng.integers(0, 255, size=(640, 640, 3), dtype=np.uint8), None)
+                for i in range(limit)]
+    images = []
+    for path, label in list_directory(image_dir)[:limit]:
+        image = cv2.imread(path)
+        if image is not None:
+            images.append((path, image, label))
+    return images
+
+
+def run_variant(model, images):
+    import supervision as sv
+
+    for _, image, _ in images[:WARM_UP_RUNS]:
+        model.infer(image)
+    latencies, outputs = [], []
+    for _, image, _ in images:
+        start = time.perf_counter()
+        result = model.infer(image)[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        detections = sv.Detections.from_inference(result)
+        class_id = detections.class_id if detections.class_id is not None else np.zeros(len(detections), int)
+        confidence = detections.confidence if detections.confidence is not None else np.ones(len(detections))
+        outputs.append((detections.xyxy, confidence, class_id))
+    return latencies, outputs
+
+
+def compare(outputs, reference) -> dict:
+    evaluator = DetectionEvaluator()
+    for (xyxy, scores, cls), (ref_xyxy, _, ref_cls) in zip(outputs, reference):
+        evaluator.add(xyxy, scores, cls, ref_xyxy, ref_cls)
+    return evaluator.summary()
+
+
+def against_labels(outputs, images):
+    evaluator = DetectionEvaluator()
+    for (xyxy, scores, cls), (_, image, label) in zip(outputs, images):
+        if label:
+            gt_cls, gt_xyxy = load_yolo_labels(label, image.shape[1], image.shape[0])
+            evaluator.add(xyxy, scores, cls, gt_xyxy, gt_cls)
+    return evaluator.summary() if evaluator.images else None
+
+
+def _fmt(value) -> str:
+    return "n/a" if value is None else f"{value:.3f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="directory of images (and optional YOLO labels)")
+    parser.add_argument("--limit", type=int, default=200, help="images to run per variant")
+    parser.add_argument("--variants", default=",".join(VARIANTS), help="comma-separated, stock always runs")
+    parser.add_argument("--calibration", help="images for static INT8 calibration")
+    parser.add_argument("--report", help="write the JSON report here")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    variants = ["stock"] + [v for v in args.variants.split(",") if v and v != "stock"]
+    images = load_images(args.images, args.limit)
+    model = engine.load_model()
+    print(f"{YOLO_MODEL_DETECTOR}: {len(images)} images, variants {', '.join(variants)}")
+
+    rows, reference = [], None
+    for variant in variants:
+        start = time.perf_counter()
+        try:
+            path = apply_variant(model, variant, MODEL_CACHE_DIR, args.calibration)
+        except Exception as e:
+            print(f"{variant:>6}: unavailable ({e})")
+            continue
+        load_s = time.perf_counter() - start
+        latencies, outputs = run_variant(model, images)
+        if reference is None:
+            reference = outputs
+        labels = against_labels(outputs, images)
+        rows.append({
+            "variant": variant,
+            "path": path,
+            "size_mb": round(os.path.getsize(path) / 2 ** 20, 2),
+            "build_or_load_s": round(load_s, 2),
+            "latency_ms": percentiles(latencies),
+            "vs_stock": compare(outputs, reference),
+            "vs_labels": labels,
+        })
+    apply_variant(model, "stock", MODEL_CACHE_DIR)
+
+    stock_p50 = rows[0]["latency_ms"]["p50"] if rows else None
+    print(f"{'variant':>8} {'size MB':>8} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'speedup':>8} "
+          f"{'mAP50 vs stock':>15} {'mAP50 labels':>13}")
+    for row in rows:
+        latency = row["latency_ms"]
+        labels = row["vs_labels"]
+        print(f"{row['variant']:>8} {row['size_mb']:8.2f} {row['build_or_load_s']:7.2f} "
+              f"{latency['p50']:8.2f} {latency['p95']:8.2f} {stock_p50 / latency['p50']:7.2f}x "
+              f"{_fmt(row['vs_stock']['map50']):>15} {_fmt(labels['map50'] if labels else None):>13}")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"model": YOLO_MODEL_DETECTOR, "images": len(images), "variants": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""Offline bulk detection and evaluation.
+
+Runs the /ai/detect-image pipeline (ingest limits, detector, optional
+annotation) over a directory or a manifest of images and writes one JSON
+object per image to an NDJSON file. At the end it prints a report with
+throughput, latency percentiles and, where labels exist, precision, recall
+and mAP.
+
+Usage (from backend/ai-service):
+
+    python bulk_detect.py --images data/val --output results.ndjson
+    python bulk_detect.py --manifest val.jsonl --output results.ndjson --report report.json
+    python bulk_detect.py --images data/val --output tiled.ndjson --tiled --model my-detector/2
+
+A manifest holds one image per line: a plain path, or a JSON object
+``{"image": path, "labels": path}``. Relative paths are resolved against the
+manifest's directory. For ``--images``, a YOLO label file ``<name>.txt`` next
+to each image (or in ``--labels``) is used when present. Label class ids
+must be the model's class ids.
+
+Images are decoded by a thread pool a few batches ahead of the detector,
+and each batch goes to the model in a single call. The output file is also
+the checkpoint. It is flushed after every batch, and images already in it
+are skipped, so an interrupted run resumes where it stopped. ``--fresh``
+starts over.
+"""
+import argparse
+import glob
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+def list_directory(image_dir: str, label_dir: str = None) -> list:
+    items = []
+    for path in sorted(glob.glob(os.path.join(image_dir, "**", "*"), recursive=True)):
+        if os.path.splitext(path)[1].lower() not in IMAGE_EXTENSIONS:
+            continue
+        stem = os.path.splitext(path)[0]
+        if label_dir:
+            stem = os.path.join(label_dir, os.path.relpath(stem, image_dir))
+        label = stem + ".txt"
+        items.append((path, label if os.path.exists(label) else None))
+    return items
+
+
+def read_manifest(manifest: str) -> list:
+    base = os.path.dirname(os.path.abspath(manifest))
+    items = []
+    with open(manifest, encoding="utf-8") as f:
+        for line in filter(None, (line.strip() for line in f)):
+            if line.startswith("{"):
+                entry = json.loads(line)
+                image, label = entry["image"], entry.get("labels")
+            else:
+                image, label = line, None
+            items.append((
+                os.path.join(base, image),
+                os.path.join(base, label) if label else None,
+            ))
+    return items
+
+
+def annotated_path(path: str, root: str, annotated_dir: str) -> str:
+    """Where the annotated JPEG of ``path`` goes, mirroring its location under ``root``.
+
+    Keeps images with the same name in different subdirectories (or with
+    different extensions) apart. Paths outside ``root``, which a manifest may
+    list, keep their full path below ``annotated_dir``.
+    """
+    path = os.path.abspath(path)
+    relative = os.path.relpath(path, os.path.abspath(root))
+    if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        relative = os.path.splitdrive(path)[1].lstrip(os.sep)
+    stem, ext = os.path.splitext(relative)
+    return os.path.join(annotated_dir, stem + ".jpg" if ext.lower() == ".jpg" else relative + ".jpg")
+
+
+def load_checkpoint(output: str) -> dict:
+    """Records already written to ``output``, by image path.
+
+    A partial last line (the run was killed mid-write) is cut off.
+    """
+    done = {}
+    if not os.path.exists(output):
+        return done
+    good = 0
+    with open(output, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            done[record["image"]] = record
+            good += len(line)
+    if good != os.path.getsize(output):
+        with open(output, "r+b") as f:
+            f.truncate(good)
+    return done
+
+
+def prefetch(pool, fn, items, depth: int):
+    """Yield ``fn(item)`` in order, keeping at most ``depth`` calls in flight."""
+    pending = deque()
+    items = iter(items)
+    for item in itertools.islice(items, depth):
+        pending.append(pool.submit(fn, item))
+    while pending:
+        yield pending.popleft().result()
+        for item in itertools.islice(items, 1):
+            pending.append(pool.submit(fn, item))
+
+
+def batched(iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {}
+    p50, p90, p95, p99 = np.percentile(values, [50, 90, 95, 99])
+    return {
+        "mean": round(float(np.mean(values)), 2),
+        "p50": round(float(p50), 2),
+        "p90": round(float(p90), 2),
+        "p95": round(float(p95), 2),
+        "p99": round(float(p99), 2),
+        "max": round(float(np.max(values)), 2),
+    }
+
+
+def make_loader(max_pixels: int, max_decode_pixels: int, downscale: bool):
+    from ingest import IngestError, decode_image
+
+    def load(item):
+        path, label = item
+        start = time.perf_counter()
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            image = decode_image(data, max_pixels, max_decode_pixels, downscale)
+            error = None
+        except IngestError as e:
+            image, error = None, e.detail
+        except OSError as e:
+            image, error = None, str(e)
+        return path, label, image, (time.perf_counter() - start) * 1000, error
+
+    return load
+
+
+def detection_record(path: str, label, image, detections, decode_ms: float, inference_ms: float) -> dict:
+    from yolo_detector.engine import detection_labels
+
+    names = detection_labels(detections)
+    confidence = detections.confidence if detections.confidence is not None else np.ones(len(detections))
+    class_id = detections.class_id if detections.class_id is not None else np.full(len(detections), -1)
+    return {
+        "image": path,
+        "labels": label,
+        "width": image.shape[1],
+        "height": image.shape[0],
+        "ingredients": sorted(set(names)),
+        "detections": [
+            {
+                "class_id": int(class_id[i]),
+                "class_name": names[i] if i < len(names) else None,
+                "confidence": round(float(confidence[i]), 4),
+                "box": [round(float(v), 1) for v in detections.xyxy[i]],
+            }
+            for i in range(len(detections))
+        ],
+        "decode_ms": round(decode_ms, 2),
+        "inference_ms": round(inference_ms, 2),
+    }
+
+
+def evaluate(records) -> dict:
+    from yolo_detector.metrics import DetectionEvaluator, load_yolo_labels
+
+    evaluator = DetectionEvaluator()
+    for record in records:
+        if record.get("error") or not record.get("labels"):
+            continue
+        gt_cls, gt_xyxy = load_yolo_labels(record["labels"], record["width"], record["height"])
+        dets = record["detections"]
+        evaluator.add(
+            np.array([d["box"] for d in dets]).reshape(-1, 4),
+            np.array([d["confidence"] for d in dets]),
+            np.array([d["class_id"] for d in dets], dtype=int),
+            gt_xyxy,
+            gt_cls,
+        )
+    return evaluator.summary() if evaluator.images else None
+
+
+def run(args) -> dict:
+    from config import (
+        YOLO_MODEL_DETECTOR, TILED_INFERENCE, MAX_IMAGE_PIXELS, MAX_DECODE_PIXELS, DOWNSCALE_OVERSIZED,
+    )
+    from yolo_detector import engine
+
+    tiled = TILED_INFERENCE if args.tiled is None else args.tiled
+    items = read_manifest(args.manifest) if args.manifest else list_directory(args.images, args.labels)
+    if args.limit:
+        items = items[:args.limit]
+
+    if args.fresh and os.path.exists(args.output):
+        os.remove(args.output)
+    done = load_checkpoint(args.output)
+    pending = [item for item in items if item[0] not in done]
+    print(f"{len(items)} images, {len(done)} already in {args.output}, {len(pending)} to run "
+          f"(model {YOLO_MODEL_DETECTOR}, {'tiled' if tiled else 'single pass'}, batch {args.batch})",
+          file=sys.stderr)
+
+    if args.annotated_dir:
+        os.makedirs(args.annotated_dir, exist_ok=True)
+        # Output names mirror the input layout, relative to the directory or manifest
+        annotated_root = args.images or os.path.dirname(os.path.abspath(args.manifest))
+
+    engine.load_model()
+    load = make_loader(MAX_IMAGE_PIXELS, MAX_DECODE_PIXELS, DOWNSCALE_OVERSIZED)
+    decode_ms, inference_ms, latency_ms = [], [], []
+    errors = processed = 0
+    records = list(done.values())
+
+    start = time.perf_counter()
+    with open(args.output, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=args.decode_workers, thread_name_prefix="decode") as pool:
+        for batch in batched(prefetch(pool, load, pending, args.batch * 2), args.batch):
+            ok = [entry for entry in batch if entry[2] is not None]
+            infer_ms = 0.0
+            if ok:
+                infer_start = time.perf_counter()
+                results = engine.detect_batch([entry[2] for entry in ok], tiled=tiled)
+                # Images share one model call; attribute the batch time evenly
+                infer_ms = (time.perf_counter() - infer_start) * 1000 / len(ok)
+            results = iter(results if ok else [])
+
+            for path, label, image, decoded_ms, error in batch:
+                if error is not None:
+                    record = {"image": path, "labels": label, "error": error}
+                    errors += 1
+                else:
+                    detections = next(results)
+                    record = detection_record(path, label, image, detections, decoded_ms, infer_ms)
+                    decode_ms.append(decoded_ms)
+                    inference_ms.append(infer_ms)
+                    latency_ms.append(decoded_ms + infer_ms)
+                    if args.annotated_dir:
+                        annotated = engine.annotate(image, detections, labels=engine.detection_labels(detections))
+                        target = annotated_path(path, annotated_root, args.annotated_dir)
+                        os.makedirs(os.path.dirname(target), exist_ok=True)
+                        with open(target, "wb") as f:
+                            f.write(engine.encode_jpeg(annotated))
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                records.append(record)
+                processed += 1
+
+            out.flush()
+            os.fsync(out.fileno())
+            if args.progress and processed % args.progress < len(batch):
+                rate = processed / (time.perf_counter() - start)
+                print(f"{processed}/{len(pending)} images, {rate:.1f} images/s", file=sys.stderr)
+    wall_s = time.perf_counter() - start
+
+    return {
+        "model": YOLO_MODEL_DETECTOR,
+        "tiled": tiled,
+        "batch": args.batch,
+        "decode_workers": args.decode_workers,
+        "images": len(items),
+        "resumed": len(done),
+        "processed": processed,
+        "errors": errors,
+        "wall_s": round(wall_s, 2),
+        "throughput_images_per_s": round(processed / wall_s, 2) if wall_s > 0 else None,
+        "decode_ms": percentiles(decode_ms),
+        "inference_ms": percentiles(inference_ms),
+        "latency_ms": percentiles(latency_ms),
+        "metrics": evaluate(records),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--images", help="directory of images, searched recursively")
+    source.add_argument("--manifest", help="file with one image path or JSON object per line")
+    parser.add_argument("--labels", help="directory of YOLO label files mirroring --images")
+    parser.add_argument("--output", required=True, help="NDJSON results, also used as the checkpoint")
+    parser.add_argument("--report", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--annotated-dir", help="also write annotated JPEGs here, mirroring the input layout")
+    parser.add_argument("--model", help="model id (default: YOLO_MODEL_DETECTOR)")
+    parser.add_argument("--tiled", action="store_true", default=None, help="tiled inference")
+    parser.add_argument("--no-tiled", dest="tiled", action="store_false", help="single-pass inference")
+    parser.add_argument("--batch", type=int, default=8, help="images per model call")
+    parser.add_argument("--decode-workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--limit", type=int, help="only the first N images")
+    parser.add_argument("--progress", type=int, default=500, help="log progress every N images, 0 = off")
+    parser.add_argument("--fresh", action="store_true", help="discard existing results instead of resuming")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if args.model:
+        # config reads the model id at import
+        os.environ["YOLO_MODEL_DETECTOR"] = args.model
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
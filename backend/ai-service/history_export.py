@@ -0,0 +1,188 @@
+"""Streaming export of the detection history (``detects`` table).
+
+Rows are read in keyset pages (``WHERE id > :last ORDER BY id LIMIT n``).
+Each page runs on its own pooled connection with a server-side cursor
+(``yield_per``). Memory stays bounded by one page however many rows are
+exported. A slow client does not hold a connection or a snapshot open
+between pages. Every row carries its ``id``, so an interrupted export can be
+continued with ``after_id``.
+
+Image payloads are left out of the SELECT unless ``include_images`` is set,
+in which case they are base64 encoded. ``image_bytes`` is always reported.
+
+CLI (from backend/ai-service, DATABASE_URL in the environment):
+
+    python history_export.py --format csv --output detects.csv
+    python history_export.py --user-id 42 --since 2024-01-01 > detects.ndjson
+"""
+import argparse
+import base64
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+from functools import lru_cache
+
+from sqlalchemy import (
+    ARRAY, TIMESTAMP, Column, Integer, LargeBinary, MetaData, String, Table, Text,
+    create_engine, func, select,
+)
+
+from config import DATABASE_URL, HISTORY_EXPORT_PAGE_SIZE
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+CSV_FIELDS = ["id", "user_id", "created_at", "detected_ingredients", "recommendation",
+              "image_mime_type", "image_bytes"]
+CHUNK_BYTES = 64 * 1024
+
+metadata = MetaData()
+
+users = Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("email", String(100)),
+)
+
+detects = Table(
+    "detects", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer),
+    Column("image", LargeBinary),
+    Column("image_mime_type", String(50)),
+    Column("detected_ingredients", ARRAY(Text)),
+    Column("recommendation", Text),
+    Column("created_at", TIMESTAMP),
+)
+
+
+@lru_cache(maxsize=None)
+def get_engine():
+    return create_engine(DATABASE_URL, pool_pre_ping=True, pool_size=5, max_overflow=5)
+
+
+def find_user_id(email: str):
+    with get_engine().connect() as conn:
+        return conn.execute(select(users.c.id).where(users.c.email == email)).scalar()
+
+
+def _select(include_images: bool, user_id, since, until):
+    columns = [c for c in detects.c if c.name != "image"]
+    columns.append(func.octet_length(detects.c.image).label("image_bytes"))
+    if include_images:
+        columns.append(detects.c.image)
+    stmt = select(*columns)
+    if user_id is not None:
+        stmt = stmt.where(detects.c.user_id == user_id)
+    if since is not None:
+        stmt = stmt.where(detects.c.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(detects.c.created_at < until)
+    return stmt
+
+
+def iter_rows(user_id: int = None, since: datetime = None, until: datetime = None,
+              after_id: int = 0, include_images: bool = False,
+              page_size: int = HISTORY_EXPORT_PAGE_SIZE, limit: int = None):
+    """Yield detection rows as dicts in ``id`` order."""
+    stmt = _select(include_images, user_id, since, until)
+    engine = get_engine()
+    last_id = after_id or 0
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        page = stmt.where(detects.c.id > last_id).order_by(detects.c.id).limit(size)
+        count = 0
+        with engine.connect() as conn:
+            # Server-side cursor: rows arrive in chunks instead of the whole page at once
+            result = conn.execution_options(yield_per=min(size, 1000)).execute(page)
+            for row in result.mappings():
+                count += 1
+                last_id = row["id"]
+                yield dict(row)
+        if remaining is not None:
+            remaining -= count
+        if count < size:
+            return
+
+
+def _jsonable(row: dict) -> dict:
+    row = dict(row)
+    if row.get("created_at") is not None:
+        row["created_at"] = row["created_at"].isoformat()
+    if row.get("image") is not None:
+        row["image"] = base64.b64encode(row["image"]).decode()
+    return row
+
+
+def _chunked(lines):
+    """Group encoded lines into chunks of about CHUNK_BYTES."""
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield (json.dumps(_jsonable(row), ensure_ascii=False) + "\n").encode()
+
+
+def csv_lines(rows, include_images: bool = False):
+    fields = CSV_FIELDS + (["image"] if include_images else [])
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        row = _jsonable(row)
+        row["detected_ingredients"] = ";".join(row.get("detected_ingredients") or [])
+        writer.writerow(row)
+        yield out.getvalue().encode()
+        out.seek(0)
+        out.truncate()
+    # Header only, when there are no rows
+    if out.tell():
+        yield out.getvalue().encode()
+
+
+def export_chunks(fmt: str, include_images: bool = False, **filters):
+    """Encoded export in chunks of about CHUNK_BYTES; ``filters`` go to :func:`iter_rows`."""
+    rows = iter_rows(include_images=include_images, **filters)
+    lines = csv_lines(rows, include_images) if fmt == "csv" else ndjson_lines(rows)
+    return _chunked(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=sorted(FORMATS), default="ndjson")
+    parser.add_argument("--output", help="file to write (default: stdout)")
+    parser.add_argument("--user-id", type=int)
+    parser.add_argument("--since", type=datetime.fromisoformat, help="created_at >= (ISO date)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="created_at < (ISO date)")
+    parser.add_argument("--after-id", type=int, default=0, help="resume after this row id")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--include-images", action="store_true")
+    parser.add_argument("--page-size", type=int, default=HISTORY_EXPORT_PAGE_SIZE)
+    args = parser.parse_args()
+
+    chunks = export_chunks(
+        args.format, include_images=args.include_images, user_id=args.user_id,
+        since=args.since, until=args.until, after_id=args.after_id,
+        page_size=args.page_size, limit=args.limit,
+    )
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Bounded-memory ingestion of uploaded images.
+
+* ``BodySizeLimitMiddleware`` rejects oversized requests from the
+  Content-Length header, and otherwise counts bytes while the body streams
+  in, so a large upload is refused before it is buffered.
+* ``read_dimensions`` gets the size of a JPEG, PNG, WebP or BMP image from
+  its header, without decoding pixels.
+* ``decode_image`` uses those dimensions to refuse decompression bombs
+  before decoding. Oversized JPEGs are decoded directly at 1/2, 1/4 or 1/8
+  scale; other formats are decoded and resized only below a hard pixel cap.
+  Only sequential Huffman JPEGs (SOF0/SOF1) decode scanline by scanline.
+  Progressive, arithmetic-coded, lossless and hierarchical JPEGs make
+  libjpeg buffer coefficients for the full image even for a reduced decode,
+  so they get the same hard cap.
+
+``IngestStats`` records the buffers held at each stage. Its ``peak_bytes``
+is the largest total held at once for the request.
+"""
+import base64
+import binascii
+import resource
+import struct
+
+import numpy as np
+from fastapi import HTTPException
+
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Baseline and extended sequential Huffman: decoded without whole-image buffers
+JPEG_SEQUENTIAL_MARKERS = {0xC0, 0xC1}
+JPEG_REDUCTIONS = (1, 2, 4, 8)
+
+
+class IngestError(HTTPException):
+    pass
+
+
+class BodySizeLimitMiddleware:
+    """ASGI middleware limiting the request body to ``max_bytes``."""
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.max_bytes <= 0:
+            return await self.app(scope, receive, send)
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_bytes:
+                return await self._reject(send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised while the endpoint reads the body; FastAPI turns it into the response
+                    raise IngestError(status_code=413, detail="Request body too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send):
+        body = b'{"detail":"Request body too large"}'
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def _jpeg_dimensions(data: bytes):
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        (length,) = struct.unpack(">H", data[i + 2:i + 4])
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return width, height, marker
+        i += 2 + length
+    return None
+
+
+def read_dimensions(data: bytes):
+    """Return ``(format, width, height)`` from the image header, or ``None``.
+
+    JPEGs are ``"jpeg"`` when sequential Huffman coded, else ``"jpeg-buffered"``.
+    """
+    if data[:2] == b"\xff\xd8":
+        header = _jpeg_dimensions(data)
+        if header is None:
+            return None
+        width, height, marker = header
+        return "jpeg" if marker in JPEG_SEQUENTIAL_MARKERS else "jpeg-buffered", width, height
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        width, height = struct.unpack(">II", data[16:24])
+        return "png", width, height
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP" and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b"VP8 ":
+            width, height = struct.unpack("<HH", data[26:30])
+            return "webp", width & 0x3FFF, height & 0x3FFF
+        if chunk == b"VP8L":
+            bits = int.from_bytes(data[21:25], "little")
+            return "webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8X":
+            return "webp", int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+        return None
+    if data[:2] == b"BM" and len(data) >= 26:
+        width, height = struct.unpack("<ii", data[18:26])
+        return "bmp", abs(width), abs(height)
+    return None
+
+
+class IngestStats:
+    def __init__(self):
+        self.peak_bytes = 0
+        self.format = None
+        self.source_size = None
+        self.decoded_size = None
+        self._rss_start = _max_rss()
+
+    def hold(self, *buffers):
+        """Record that ``buffers`` are alive at the same time."""
+        self.peak_bytes = max(self.peak_bytes, sum(_nbytes(b) for b in buffers))
+
+    @property
+    def rss_growth(self) -> int:
+        """Growth of the process' peak RSS during the request, in bytes."""
+        return (_max_rss() - self._rss_start) * 1024
+
+    def as_dict(self) -> dict:
+        return {
+            "format": self.format,
+            "source_size": self.source_size,
+            "decoded_size": self.decoded_size,
+            "peak_bytes": self.peak_bytes,
+            "rss_growth": self.rss_growth,
+        }
+
+
+def _nbytes(buffer) -> int:
+    return buffer.nbytes if isinstance(buffer, np.ndarray) else len(buffer)
+
+
+def _max_rss() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def decode_base64_image(payload: str, max_pixels: int, max_decode_pixels: int,
+                        downscale: bool = True):
+    """Decode a base64 (optionally data-URL) image within the pixel limits.
+
+    Returns ``(image, stats)``; raises :class:`IngestError` on invalid or
+    oversized input.
+    """
+    stats = IngestStats()
+    encoded = payload.split(",", 1)[1] if "," in payload else payload
+    try:
+        data = base64.b64decode(encoded, validate=False)
+    except (binascii.Error, ValueError):
+        raise IngestError(status_code=400, detail="Invalid image data")
+    stats.hold(payload, data)
+    return decode_image(data, max_pixels, max_decode_pixels, downscale, stats), stats
+
+
+def decode_image(data: bytes, max_pixels: int, max_decode_pixels: int,
+                 downscale: bool = True, stats: IngestStats = None):
+    import cv2
+
+    stats = stats or IngestStats()
+    header = read_dimensions(data)
+    if header is None:
+        raise IngestError(status_code=415, detail="Unsupported or invalid image format")
+    fmt, width, height = header
+    stats.format, stats.source_size = fmt, (width, height)
+    pixels = width * height
+    if pixels == 0:
+        raise IngestError(status_code=400, detail="Invalid image data")
+    if pixels > max_pixels and not downscale:
+        raise IngestError(status_code=413, detail=f"Image exceeds {max_pixels} pixels")
+
+    if fmt in ("jpeg", "jpeg-buffered"):
+        if fmt == "jpeg-buffered" and pixels > max_decode_pixels:
+            # Reduced output does not shrink the full-size coefficient buffers
+            raise IngestError(status_code=413, detail=f"Image exceeds {max_decode_pixels} pixels")
+        # The JPEG decoder can produce 1/2, 1/4 and 1/8 scale output directly
+        factor = next((f for f in JPEG_REDUCTIONS if pixels <= max_pixels * f * f), None)
+        if factor is None:
+            raise IngestError(status_code=413, detail=f"Image exceeds {max_pixels * 64} pixels")
+        flag = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}[factor]
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+    else:
+        if pixels > max_decode_pixels:
+            raise IngestError(status_code=413, detail=f"Image exceeds {max_decode_pixels} pixels")
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is not None and pixels > max_pixels:
+            scale = (max_pixels / pixels) ** 0.5
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            resized = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+            stats.hold(data, image, resized)
+            image = resized
+
+    if image is None:
+        raise IngestError(status_code=400, detail="Invalid image data")
+    stats.hold(data, image)
+    stats.decoded_size = (image.shape[1], image.shape[0])
+    return image
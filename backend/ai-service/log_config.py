@@ -0,0 +1,203 @@
+"""Logging setup for ai-service.
+
+Records are handed to a queue and written by a background thread, so a log
+call on the event loop costs little more than building the record. The
+queue handler also:
+
+* injects the current request id (set by the request middleware),
+* samples and rate-limits chatty loggers (WARNING and above always pass),
+* redacts secrets before anything is formatted or written.
+
+Output is one JSON object per line (LOG_FORMAT=json) or plain text.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import threading
+import time
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+REDACTED = "[REDACTED]"
+SECRET_ENV_VARS = ("ROBOFLOW_API_KEY", "SECRET_KEY", "DATABASE_URL")
+SECRET_PATTERNS = [
+    re.compile(r"(?i)(bearer\s+)[A-Za-z0-9\-_.~+/]+=*"),
+    re.compile(r"(?i)((?:api[_-]?key|token|password|secret)[\"']?\s*[=:]\s*[\"']?)[^\s\"'&,]+"),
+]
+
+# Third-party loggers that are very verbose at DEBUG/INFO
+NOISY_LOGGERS = {"httpx": logging.WARNING, "httpcore": logging.WARNING, "inference": logging.INFO}
+
+_listener = None
+
+
+def parse_mapping(spec: str) -> dict:
+    """Parse ``"name=value,name=value"`` into ``{name: float}``."""
+    mapping = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        name, _, value = item.partition("=")
+        mapping[name.strip()] = float(value)
+    return mapping
+
+
+def _lookup(mapping: dict, logger_name: str):
+    """Value configured for the logger or its closest configured parent."""
+    name = logger_name
+    while name:
+        if name in mapping:
+            return mapping[name]
+        name = name.rpartition(".")[0]
+    return None
+
+
+class RequestContextFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of records per logger and caps the rate per message.
+
+    ``sample_rates``: logger -> fraction kept; ``rate_limits``: logger ->
+    records per second for each distinct message template.
+    """
+
+    def __init__(self, sample_rates: dict = None, rate_limits: dict = None):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.rate_limits = rate_limits or {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = _lookup(self.sample_rates, record.name)
+        if rate is not None and random.random() >= rate:
+            self.dropped += 1
+            return False
+        limit = _lookup(self.rate_limits, record.name)
+        if limit is not None and not self._take(record, limit):
+            self.dropped += 1
+            return False
+        return True
+
+    def _take(self, record, per_second: float) -> bool:
+        key = (record.name, record.msg if isinstance(record.msg, str) else type(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (per_second, now))
+            tokens = min(per_second, tokens + (now - updated) * per_second)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+        return allowed
+
+
+class RedactingFilter(logging.Filter):
+    """Merges the message arguments and masks secret values in the result."""
+
+    def __init__(self, secrets=()):
+        super().__init__()
+        self.secrets = [s for s in secrets if s and len(s) >= 6]
+
+    def redact(self, text: str) -> str:
+        for secret in self.secrets:
+            text = text.replace(secret, REDACTED)
+        for pattern in SECRET_PATTERNS:
+            text = pattern.sub(lambda m: m.group(1) + REDACTED, text)
+        return text
+
+    def filter(self, record):
+        record.msg = self.redact(record.getMessage())
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.redact(logging.Formatter().formatException(record.exc_info))
+        record.exc_info = None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s - %(levelname)s - %(name)s [%(request_id)s] - %(message)s")
+
+    def format(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        return super().format(record)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    dropped = 0
+
+    def prepare(self, record):
+        # Filters already merged the args; skip the second format pass of QueueHandler
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level: str = "INFO", fmt: str = "json", sampling: str = "",
+                  rate_limits: str = "", queue_size: int = 10000, stream=None):
+    """Route all logging through a background writer thread. Idempotent."""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    writer = logging.StreamHandler(stream)
+    writer.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    # Bounded queue: under extreme load records are dropped rather than blocking callers
+    log_queue = queue.Queue(maxsize=queue_size)
+    handler = _DroppingQueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(SamplingFilter(parse_mapping(sampling), parse_mapping(rate_limits)))
+    handler.addFilter(RedactingFilter([os.getenv(name) for name in SECRET_ENV_VARS]))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    for name, noisy_level in NOISY_LOGGERS.items():
+        logging.getLogger(name).setLevel(max(noisy_level, root.level))
+
+    _listener = logging.handlers.QueueListener(log_queue, writer, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
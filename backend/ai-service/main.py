@@ -1,29 +1,54 @@
-from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
+from datetime import datetime
 import httpx
-import random
 import base64
-import cv2
-import numpy as np
-from inference import get_model
-import supervision as sv
-from config import YOLO_MODEL_DETECTOR
+import hmac
+import threading
+import uuid
+from starlette.concurrency import run_in_threadpool
+from config import (
+    TILED_INFERENCE, WARMUP_ON_STARTUP, INFERENCE_CONCURRENCY, ADMISSION_QUEUE_TIMEOUT,
+    DETECT_IMAGE_RATE_PER_MINUTE, DETECT_IMAGE_BURST, DETECT_TEXT_RATE_PER_MINUTE, DETECT_TEXT_BURST,
+    TEXT_KEYWORDS_FILE, TEXT_BATCH_MAX, DETECT_TEXT_BATCH_RATE_PER_MINUTE, DETECT_TEXT_BATCH_BURST,
+    RECIPE_INDEX_DIR, RECIPE_INDEX_CHECK_INTERVAL, RECOMMENDATION_TOP_K,
+    INFERENCE_WORKERS, SHM_SLOTS, SHM_SLOT_BYTES, SHM_SLOT_TIMEOUT, INFERENCE_TIMEOUT, INFERENCE_MAX_RESTARTS,
+    LOG_LEVEL, LOG_FORMAT, LOG_SAMPLING, LOG_RATE_LIMITS,
+    MAX_BODY_BYTES, MAX_IMAGE_PIXELS, MAX_DECODE_PIXELS, DOWNSCALE_OVERSIZED,
+    PROFILING_ENABLED, PROFILING_ADMIN_TOKEN, PROFILE_EVERY_N, PROFILE_MAX_SECONDS,
+    HISTORY_EXPORT_CONCURRENCY, HISTORY_EXPORT_ADMIN_TOKEN,
+)
+from ingest import BodySizeLimitMiddleware, decode_base64_image
+from log_config import setup_logging, request_id_var
+from admission import PriorityClass
+from recommender import Recommender
+from shm_transport import FrameWorkerPool, NoWorkerAvailable, cleanup_stale_segments
+from text_screen import get_classifier
+# Heavy modules (inference, supervision, cv2) are imported lazily by the engine
+from yolo_detector import engine
 import os
 from dotenv import load_dotenv
 
 import logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Load Model API key (before logging setup, so the key is known to the redactor)
+load_dotenv()
+api_key = os.getenv('ROBOFLOW_API_KEY')
+
+# Non-blocking structured logging
+setup_logging(LOG_LEVEL, LOG_FORMAT, sampling=LOG_SAMPLING, rate_limits=LOG_RATE_LIMITS)
 
 # Create a logger
 logger = logging.getLogger(__name__)
 
-# Load Model API key
-load_dotenv()
-api_key = os.getenv('ROBOFLOW_API_KEY')
-logger.info(f"API KEY LOADED: {api_key}")
-os.environ['ROBOFLOW_API_KEY'] = api_key
+if api_key:
+    os.environ['ROBOFLOW_API_KEY'] = api_key
+    logger.info("Roboflow API key loaded")
+else:
+    logger.warning("ROBOFLOW_API_KEY is not set, model loading will fail")
 
 app = FastAPI(title="AI Service")
 
@@ -34,6 +59,59 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=MAX_BODY_BYTES)
+
+if PROFILING_ENABLED:
+    import profiling
+    profiling.install(app, "/ai/admin", PROFILING_ADMIN_TOKEN,
+                      every_n=PROFILE_EVERY_N, max_seconds=PROFILE_MAX_SECONDS)
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    # Request id for log records, taken from the gateway when present
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+recipe_recommender = Recommender(RECIPE_INDEX_DIR, check_interval=RECIPE_INDEX_CHECK_INTERVAL)
+# Worker processes sharing decoded frames through shared memory, when enabled
+inference_pool = None
+
+@app.on_event("startup")
+def start_warm_up():
+    global inference_pool
+    # Compile the keyword matcher now rather than on the first /ai/detect call
+    get_classifier(TEXT_KEYWORDS_FILE)
+    try:
+        recipe_recommender.reload()
+    except (OSError, ValueError) as e:
+        # A broken published index must not stop the service; retried on use
+        logger.warning("Recipe index not loaded, serving without recommendations: %s", e)
+    if INFERENCE_WORKERS > 0:
+        # Workers load and warm up the model themselves
+        cleanup_stale_segments()
+        inference_pool = FrameWorkerPool(
+            engine.detect_frame,
+            workers=INFERENCE_WORKERS,
+            slots=SHM_SLOTS or 2 * INFERENCE_WORKERS,
+            slot_bytes=SHM_SLOT_BYTES,
+            initializer=engine.warm_up if WARMUP_ON_STARTUP else None,
+            slot_timeout=SHM_SLOT_TIMEOUT,
+            max_restarts=INFERENCE_MAX_RESTARTS,
+        ).start()
+    # Warm up in the background; /ai/ready reports when the model is usable
+    elif WARMUP_ON_STARTUP:
+        threading.Thread(target=engine.warm_up_with_retry, name="warm-up", daemon=True).start()
+
+@app.on_event("shutdown")
+def stop_workers():
+    if inference_pool is not None:
+        inference_pool.stop()
 
 AUTH_SERVICE_URL = "http://auth-service:8000"
 # AUTH_SERVICE_URL = "http://localhost:8000"  # For local testing
@@ -41,18 +119,26 @@ AUTH_SERVICE_URL = "http://auth-service:8000"
 class DetectionRequest(BaseModel):
     text: str
 
+class BatchDetectionRequest(BaseModel):
+    texts: list[str] = Field(..., max_length=TEXT_BATCH_MAX)
+
 class ImageDetectionRequest(BaseModel):
     image: str  # base64 encoded image
+    tiled: Optional[bool] = None  # sliced inference, defaults to TILED_INFERENCE
 
 class DetectionResponse(BaseModel):
     is_spam: bool
     confidence: float
     category: str
 
+class BatchDetectionResponse(BaseModel):
+    results: list[DetectionResponse]
+
 class ImageDetectionResponse(BaseModel):
     ingredients: list
     annotated_image: str  # base64 encoded image
     detections_count: int
+    recommendations: list = []  # top-k recipes for the detected ingredients
 
 async def verify_token(authorization: str = Header(None)):
     if not authorization or not authorization.startswith("Bearer "):
@@ -72,6 +158,33 @@ async def verify_token(authorization: str = Header(None)):
         except httpx.RequestError:
             raise HTTPException(status_code=503, detail="Auth service unavailable")
 
+# Priority classes have separate capacity, so inference load never starves
+# the cheap endpoints; health and readiness checks are not admission-controlled
+inference_admission = PriorityClass(
+    "inference",
+    rate_per_minute=DETECT_IMAGE_RATE_PER_MINUTE,
+    burst=DETECT_IMAGE_BURST,
+    max_concurrency=INFERENCE_CONCURRENCY,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+)
+text_admission = PriorityClass(
+    "text detection",
+    rate_per_minute=DETECT_TEXT_RATE_PER_MINUTE,
+    burst=DETECT_TEXT_BURST,
+)
+text_batch_admission = PriorityClass(
+    "text batch",
+    rate_per_minute=DETECT_TEXT_BATCH_RATE_PER_MINUTE,
+    burst=DETECT_TEXT_BATCH_BURST,
+)
+# Exports are long-running streams; bound how many hold a DB connection at once
+export_admission = PriorityClass(
+    "history export",
+    rate_per_minute=30,
+    burst=5,
+    max_concurrency=HISTORY_EXPORT_CONCURRENCY,
+)
+
 @app.get("/")
 def root():
     return {"service": "ai-service", "status": "running"}
@@ -79,75 +192,143 @@ def root():
 @app.post("/ai/detect", response_model=DetectionResponse)
 async def detect_spam(
     request: DetectionRequest,
-    user=Depends(verify_token)
+    user=Depends(verify_token),
+    _=Depends(text_admission.dependency(verify_token))
+):
+    return get_classifier(TEXT_KEYWORDS_FILE).classify(request.text)
+
+@app.post("/ai/detect/batch", response_model=BatchDetectionResponse)
+async def detect_spam_batch(
+    request: BatchDetectionRequest,
+    user=Depends(verify_token),
+    _=Depends(text_batch_admission.dependency(verify_token))
 ):
-    spam_keywords = ["spam", "free", "win", "click here", "congratulations"]
-    text_lower = request.text.lower()
+    classifier = get_classifier(TEXT_KEYWORDS_FILE)
+    results = await run_in_threadpool(classifier.classify_many, request.texts)
+    return {"results": results}
+
+def run_image_detection(request: ImageDetectionRequest, response: Response) -> dict:
+    # Decode base64 image; dimensions are checked from the header before decoding
+    image, ingest_stats = decode_base64_image(
+        request.image,
+        max_pixels=MAX_IMAGE_PIXELS,
+        max_decode_pixels=MAX_DECODE_PIXELS,
+        downscale=DOWNSCALE_OVERSIZED,
+    )
+    
+    # Run inference, annotate and encode (model is loaded once and shared)
+    tiled = TILED_INFERENCE if request.tiled is None else request.tiled
+    if inference_pool is not None:
+        if not inference_pool.fits(image):
+            raise HTTPException(status_code=413, detail="Image too large")
+        try:
+            future = inference_pool.submit(image, tiled=tiled)
+        except TimeoutError:
+            raise inference_admission.unavailable("No free inference slot")
+        except NoWorkerAvailable:
+            raise inference_admission.unavailable("No inference worker available")
+        try:
+            jpeg, labels = future.result(timeout=INFERENCE_TIMEOUT)
+        except TimeoutError:
+            # The worker is presumed hung; free its slot rather than leak it
+            inference_pool.abandon(future)
+            raise inference_admission.unavailable("Inference timed out")
+    else:
+        jpeg, labels = engine.detect_frame(image, tiled=tiled)
     
-    spam_count = sum(1 for keyword in spam_keywords if keyword in text_lower)
-    is_spam = spam_count > 0
-    confidence = min(spam_count * 0.2, 2.0)
+    # Encode annotated image to base64
+    annotated_image_base64 = base64.b64encode(jpeg).decode()
     
-    categories = ["spam", "normal", "promotional", "important"]
-    category = "spam" if is_spam else random.choice(["normal", "important"])
+    stats = ingest_stats.as_dict()
+    logger.debug("Image ingested: %s", stats)
+    response.headers["X-Peak-Memory-Bytes"] = str(stats["peak_bytes"])
     
+    ingredients = list(set(labels))  # Get unique ingredients
     return {
-        "is_spam": is_spam,
-        "confidence": confidence,
-        "category": category
+        "ingredients": ingredients,
+        "annotated_image": f"data:image/jpeg;base64,{annotated_image_base64}",
+        "detections_count": len(labels),
+        "recommendations": recipe_recommender.recommend(ingredients, RECOMMENDATION_TOP_K),
     }
 
 @app.post("/ai/detect-image", response_model=ImageDetectionResponse)
-# mock detector, change to yolo detector folder later
 async def detect_image(
     request: ImageDetectionRequest,
-    user=Depends(verify_token)
+    response: Response,
+    user=Depends(verify_token),
+    _=Depends(inference_admission.dependency(verify_token))
 ):
     try:
-        # Decode base64 image
-        image_data = base64.b64decode(request.image.split(',')[1])
-        nparr = np.frombuffer(image_data, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            raise HTTPException(status_code=400, detail="Invalid image data")
-        # Load pre-trained YOLOv8 model for ingredient detection
-        model = get_model(model_id=YOLO_MODEL_DETECTOR)
-        
-        # Run inference
-        results = model.infer(image)[0]
-        
-        # Load results into supervision API
-        detections = sv.Detections.from_inference(results)
-        
-        # Extract labels
-        labels = detections.data.get('class_name', [])
-        if isinstance(labels, np.ndarray):
-            labels = labels.tolist()
-        
-        # Create annotators
-        bounding_box_annotator = sv.BoxAnnotator()
-        label_annotator = sv.LabelAnnotator()
-        
-        # Annotate image
-        annotated_image = bounding_box_annotator.annotate(
-            scene=image, detections=detections)
-        annotated_image = label_annotator.annotate(
-            scene=annotated_image, detections=detections)
-        
-        # Encode annotated image to base64
-        _, buffer = cv2.imencode('.jpg', annotated_image)
-        annotated_image_base64 = base64.b64encode(buffer).decode()
-        
-        return {
-            "ingredients": list(set(labels)),  # Get unique ingredients
-            "annotated_image": f"data:image/jpeg;base64,{annotated_image_base64}",
-            "detections_count": len(labels)
-        }
+        # Inference is CPU bound, keep it off the event loop
+        return await run_in_threadpool(run_image_detection, request, response)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
 
+@app.get("/ai/history/export")
+def export_history(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    include_images: bool = False,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after_id: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, gt=0),
+    all_users: bool = False,
+    x_admin_token: str = Header(None),
+    user=Depends(verify_token),
+    _=Depends(export_admission.dependency(verify_token))
+):
+    import history_export
+
+    # Users export their own history; the admin token unlocks every user's
+    if all_users:
+        is_admin = bool(HISTORY_EXPORT_ADMIN_TOKEN and x_admin_token) and hmac.compare_digest(
+            x_admin_token.encode(), HISTORY_EXPORT_ADMIN_TOKEN.encode())
+        if not is_admin:
+            raise HTTPException(status_code=403, detail="Admin token required")
+        user_id = None
+    else:
+        user_id = history_export.find_user_id(user.get("email"))
+        if user_id is None:
+            raise HTTPException(status_code=404, detail="User not found")
+
+    chunks = history_export.export_chunks(
+        format, include_images=include_images, user_id=user_id,
+        since=since, until=until, after_id=after_id, limit=limit,
+    )
+    filename = f"detects-{datetime.now():%Y%m%d-%H%M%S}.{format}"
+    # A sync generator: Starlette iterates it in the threadpool, off the event loop
+    return StreamingResponse(
+        chunks,
+        media_type=history_export.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 @app.get("/ai/health")
 def health():
-    return {"status": "healthy", "user": "verified"}
\ No newline at end of file
+    return {
+        "status": "healthy",
+        "user": "verified",
+        "admission": {
+            "inference": inference_admission.status(),
+            "text": text_admission.status(),
+            "text_batch": text_batch_admission.status(),
+            "export": export_admission.status(),
+        },
+    }
+
+@app.get("/ai/ready")
+def ready():
+    if inference_pool is None:
+        if not engine.is_ready():
+            raise HTTPException(status_code=503, detail={"status": "warming up", "startup": engine.stats})
+        return {"status": "ready", "startup": engine.stats}
+
+    workers = inference_pool.status()
+    if inference_pool.has_failed():
+        raise HTTPException(status_code=503, detail={"status": "failed", "workers": workers})
+    if not inference_pool.is_ready():
+        raise HTTPException(status_code=503, detail={"status": "warming up", "workers": workers})
+    return {"status": "ready", "workers": workers}
\ No newline at end of file
@@ -0,0 +1,272 @@
+"""On-demand profiling of a live service.
+
+Nothing here is installed unless profiling is enabled in the service
+configuration, so a disabled service runs without any profiling code in the
+request path. When enabled:
+
+* ``ProfilingMiddleware`` samples one request in ``every_n`` and any request
+  carrying ``X-Profile: <admin token>``. The profile id is returned in the
+  ``X-Profile-Id`` response header.
+* ``create_router`` adds admin endpoints (``X-Admin-Token`` header) to run a
+  time-boxed profile of the whole process, list and download profiles, and
+  take tracemalloc snapshots diffed against the previous one.
+
+Profiles use the folded stack format (``frame;frame;frame count`` per line)
+read by flamegraph.pl, speedscope and inferno. The sampler is a thread
+reading ``sys._current_frames()`` every ``interval`` seconds. It records
+every thread, so concurrent requests show up in a per-request profile too.
+
+Both services use this module. backend/ai-service/profiling.py is the
+canonical copy; backend/auth-service/profiling.py must stay byte-identical
+(checked by ai-service's tests/test_profiling.py).
+"""
+import hmac
+import itertools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+MAX_STACK_DEPTH = 128
+MAX_PROFILES = 50
+
+
+def token_matches(token, expected: str) -> bool:
+    """Constant-time check of a presented admin token (``str`` or ``bytes``)."""
+    if not expected or not token:
+        return False
+    if isinstance(token, str):
+        token = token.encode()
+    return hmac.compare_digest(token, expected.encode())
+
+
+class StackSampler:
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self.started = None
+        self.duration = None
+
+    def _frame_name(self, frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _collapse(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < MAX_STACK_DEPTH:
+            names.append(self._frame_name(frame))
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own:
+                    self.counts[self._collapse(frame)] += 1
+            self.samples += 1
+
+    def start(self):
+        self.started = time.time()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.time() - self.started
+        return self
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.counts.most_common()) + "\n"
+
+
+class ProfileStore:
+    """Recent finished profiles, bounded to ``max_profiles``; one sampler runs at a time."""
+
+    def __init__(self, max_profiles: int = MAX_PROFILES):
+        self.max_profiles = max_profiles
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.active = None
+
+    def try_start(self, interval: float):
+        with self._lock:
+            if self.active is not None:
+                return None
+            self.active = StackSampler(interval).start()
+            return self.active
+
+    def finish(self, sampler: StackSampler, profile_id: str, kind: str):
+        sampler.stop()
+        with self._lock:
+            if self.active is sampler:
+                self.active = None
+            self._profiles[profile_id] = {
+                "id": profile_id,
+                "kind": kind,
+                "started": sampler.started,
+                "duration": round(sampler.duration, 3),
+                "samples": sampler.samples,
+                "folded": sampler.folded(),
+            }
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str):
+        return self._profiles.get(profile_id)
+
+    def list(self) -> list:
+        return [{k: v for k, v in p.items() if k != "folded"} for p in reversed(self._profiles.values())]
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling sampled or explicitly marked requests."""
+
+    def __init__(self, app, store: ProfileStore, admin_token: str, every_n: int = 0,
+                 interval: float = 0.005):
+        self.app = app
+        self.store = store
+        self.admin_token = admin_token
+        self.every_n = every_n
+        self.interval = interval
+        self._counter = itertools.count(1)
+
+    def _wanted(self, scope) -> bool:
+        if self.admin_token:
+            for name, value in scope.get("headers", []):
+                if name == b"x-profile" and token_matches(value, self.admin_token):
+                    return True
+        return self.every_n > 0 and next(self._counter) % self.every_n == 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            return await self.app(scope, receive, send)
+        sampler = self.store.try_start(self.interval)
+        if sampler is None:
+            return await self.app(scope, receive, send)
+
+        profile_id = f"req-{uuid.uuid4().hex[:12]}"
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            # Joins the sampler thread; keep that off the event loop
+            await run_in_threadpool(
+                self.store.finish, sampler, profile_id, f"request {scope.get('method')} {scope.get('path')}")
+
+
+class _Tracemalloc:
+    def __init__(self):
+        self.previous = None
+        self._lock = threading.Lock()
+
+    def snapshot(self, limit: int, key_type: str) -> str:
+        if not tracemalloc.is_tracing():
+            raise HTTPException(status_code=409, detail="tracemalloc is not running")
+        with self._lock:
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            ))
+            if self.previous is None:
+                stats = snapshot.statistics(key_type)
+                title = "top allocations"
+            else:
+                stats = snapshot.compare_to(self.previous, key_type)
+                title = "growth since previous snapshot"
+            self.previous = snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"# {title}; traced current={current} peak={peak}"]
+        lines += [str(stat) for stat in stats[:limit]]
+        return "\n".join(lines) + "\n"
+
+
+def create_router(prefix: str, store: ProfileStore, admin_token: str,
+                  max_seconds: float = 120, interval: float = 0.005) -> APIRouter:
+    router = APIRouter(prefix=prefix)
+    memory = _Tracemalloc()
+
+    def check_admin(token):
+        if not token_matches(token, admin_token):
+            raise HTTPException(status_code=403, detail="Admin token required")
+
+    @router.post("/profile/start")
+    def start_profile(seconds: float = Query(30, gt=0), x_admin_token: str = Header(None)):
+        check_admin(x_admin_token)
+        seconds = min(seconds, max_seconds)
+        sampler = store.try_start(interval)
+        if sampler is None:
+            raise HTTPException(status_code=409, detail="A profile is already running")
+        profile_id = f"run-{uuid.uuid4().hex[:12]}"
+        timer = threading.Timer(seconds, store.finish, args=(sampler, profile_id, f"process {seconds}s"))
+        timer.daemon = True
+        timer.start()
+        return {"id": profile_id, "seconds": seconds}
+
+    @router.get("/profiles")
+    def list_profiles(x_admin_token: str = Header(None)):
+        check_admin(x_admin_token)
+        return {"running": store.active is not None, "profiles": store.list()}
+
+    @router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+    def download_profile(profile_id: str, x_admin_token: str = Header(None)):
+        check_admin(x_admin_token)
+        profile = store.get(profile_id)
+        if profile is None:
+            raise HTTPException(status_code=404, detail="Profile not found or still running")
+        return PlainTextResponse(
+            profile["folded"],
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'},
+        )
+
+    @router.post("/tracemalloc/start")
+    def start_tracemalloc(frames: int = Query(10, ge=1, le=64), x_admin_token: str = Header(None)):
+        check_admin(x_admin_token)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        return {"tracing": True}
+
+    @router.get("/tracemalloc/snapshot", response_class=PlainTextResponse)
+    def tracemalloc_snapshot(limit: int = Query(25, ge=1, le=500), key_type: str = Query("lineno"),
+                             x_admin_token: str = Header(None)):
+        check_admin(x_admin_token)
+        if key_type not in ("lineno", "filename", "traceback"):
+            raise HTTPException(status_code=400, detail="key_type must be lineno, filename or traceback")
+        return memory.snapshot(limit, key_type)
+
+    @router.post("/tracemalloc/stop")
+    def stop_tracemalloc(x_admin_token: str = Header(None)):
+        check_admin(x_admin_token)
+        tracemalloc.stop()
+        memory.previous = None
+        return {"tracing": False}
+
+    return router
+
+
+def install(app, prefix: str, admin_token: str, every_n: int = 0,
+            max_seconds: float = 120, interval: float = 0.005) -> ProfileStore:
+    """Add the profiling middleware and admin routes to ``app``."""
+    store = ProfileStore()
+    app.add_middleware(ProfilingMiddleware, store=store, admin_token=admin_token,
+                       every_n=every_n, interval=interval)
+    app.include_router(create_router(prefix, store, admin_token, max_seconds, interval))
+    return store
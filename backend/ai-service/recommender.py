@@ -0,0 +1,219 @@
+"""Ingredient to recipe recommendations.
+
+The recipe corpus is indexed offline into a directory of NumPy arrays:
+
+* ``recipe_indptr`` / ``recipe_indices``: CSR rows of ingredient ids per recipe
+* ``ingredient_indptr`` / ``ingredient_indices``: the inverted index, recipe
+  ids per ingredient
+* ``meta.bin`` / ``meta_offsets``: one JSON object per recipe, decoded only
+  for the returned top-k
+
+The arrays are memory-mapped, so loading is instant and the pages are
+shared between worker processes. A query touches only the posting lists of
+the detected ingredients and scores recipes by Jaccard similarity between
+the detected set and the recipe's ingredients.
+
+Every build is written to a new version directory and published by swapping
+the ``current`` symlink; a running service notices the swap and reloads.
+
+Build an index from a JSONL corpus (``{"id", "title", "ingredients": [...]}``):
+
+    python recommender.py build recipes.jsonl /var/lib/ai-service/recipe-index
+"""
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CURRENT = "current"
+KEEP_VERSIONS = 2
+
+
+def normalize_ingredient(name: str) -> str:
+    return " ".join(name.lower().replace("_", " ").replace("-", " ").split())
+
+
+def build_index(corpus_path: str, index_root: str) -> str:
+    """Index ``corpus_path`` into a new version under ``index_root`` and publish it."""
+    vocab = {}
+    rows, meta = [], []
+    with open(corpus_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            recipe = json.loads(line)
+            ids = sorted({
+                vocab.setdefault(name, len(vocab))
+                for name in map(normalize_ingredient, recipe.get("ingredients", []))
+                if name
+            })
+            if not ids:
+                continue
+            rows.append(ids)
+            meta.append(json.dumps({
+                "id": recipe.get("id", len(meta)),
+                "title": recipe.get("title", ""),
+                "ingredients": recipe.get("ingredients", []),
+            }, ensure_ascii=False).encode())
+
+    lengths = np.fromiter((len(r) for r in rows), dtype=np.int32, count=len(rows))
+    recipe_indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=recipe_indptr[1:])
+    recipe_indices = np.fromiter((i for r in rows for i in r), dtype=np.int32, count=int(recipe_indptr[-1]))
+
+    # Inverted index: stable sort by ingredient keeps recipe ids ascending in each list
+    recipe_of_entry = np.repeat(np.arange(len(rows), dtype=np.int32), lengths)
+    order = np.argsort(recipe_indices, kind="stable")
+    ingredient_indices = recipe_of_entry[order]
+    ingredient_indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(recipe_indices, minlength=len(vocab)), out=ingredient_indptr[1:])
+
+    meta_offsets = np.zeros(len(meta) + 1, dtype=np.int64)
+    np.cumsum([len(m) for m in meta], out=meta_offsets[1:])
+
+    version = time.strftime("v%Y%m%d%H%M%S") + f"-{os.getpid()}"
+    path = os.path.join(index_root, version)
+    os.makedirs(path)
+    for name, array in (
+        ("recipe_indptr", recipe_indptr), ("recipe_indices", recipe_indices),
+        ("recipe_lengths", lengths), ("ingredient_indptr", ingredient_indptr),
+        ("ingredient_indices", ingredient_indices), ("meta_offsets", meta_offsets),
+    ):
+        np.save(os.path.join(path, f"{name}.npy"), array)
+    with open(os.path.join(path, "meta.bin"), "wb") as f:
+        for m in meta:
+            f.write(m)
+    with open(os.path.join(path, "vocab.json"), "w", encoding="utf-8") as f:
+        json.dump(sorted(vocab, key=vocab.get), f, ensure_ascii=False)
+    with open(os.path.join(path, "manifest.json"), "w") as f:
+        json.dump({"version": version, "recipes": len(rows), "ingredients": len(vocab)}, f)
+
+    _publish(index_root, version)
+    return path
+
+
+def _publish(index_root: str, version: str):
+    link = os.path.join(index_root, CURRENT)
+    tmp_link = f"{link}.{version}"
+    os.symlink(version, tmp_link)
+    os.replace(tmp_link, link)
+
+    versions = sorted(
+        v for v in os.listdir(index_root)
+        if v.startswith("v") and os.path.isdir(os.path.join(index_root, v))
+    )
+    for old in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(index_root, old), ignore_errors=True)
+
+
+class RecipeIndex:
+    """A loaded (memory-mapped) index version."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.recipe_lengths = load("recipe_lengths")
+        self.ingredient_indptr = load("ingredient_indptr")
+        self.ingredient_indices = load("ingredient_indices")
+        self.meta_offsets = load("meta_offsets")
+        self.meta = np.memmap(os.path.join(path, "meta.bin"), dtype=np.uint8, mode="r") \
+            if self.meta_offsets[-1] else np.empty(0, dtype=np.uint8)
+        with open(os.path.join(path, "vocab.json"), encoding="utf-8") as f:
+            self.vocab = {name: i for i, name in enumerate(json.load(f))}
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+
+    def recipe(self, i: int) -> dict:
+        start, end = self.meta_offsets[i], self.meta_offsets[i + 1]
+        return json.loads(self.meta[start:end].tobytes())
+
+    def recommend(self, ingredients, top_k: int = 5) -> list:
+        query = sorted({
+            self.vocab[name] for name in map(normalize_ingredient, ingredients) if name in self.vocab
+        })
+        if not query or top_k <= 0:
+            return []
+
+        postings = np.concatenate([
+            self.ingredient_indices[self.ingredient_indptr[q]:self.ingredient_indptr[q + 1]] for q in query
+        ])
+        candidates, matched = np.unique(postings, return_counts=True)
+        lengths = self.recipe_lengths[candidates]
+        scores = matched / (lengths + len(query) - matched)
+
+        k = min(top_k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        # Best score first, fewer missing ingredients breaks ties
+        top = top[np.lexsort((lengths[top] - matched[top], -scores[top]))]
+
+        results = []
+        for i in top:
+            recipe = self.recipe(int(candidates[i]))
+            results.append({
+                "id": recipe["id"],
+                "title": recipe["title"],
+                "score": round(float(scores[i]), 4),
+                "matched": int(matched[i]),
+                "missing": int(lengths[i] - matched[i]),
+            })
+        return results
+
+
+class Recommender:
+    """Serves the ``current`` index version and picks up newly published ones.
+
+    The symlink is checked at most every ``check_interval`` seconds; the
+    swap to a new version is atomic for concurrent readers.
+    """
+
+    def __init__(self, index_root: str, check_interval: float = 30.0):
+        self.index_root = index_root
+        self.check_interval = check_interval
+        self._index = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def reload(self) -> bool:
+        """Load the published version if it changed; return whether it did."""
+        link = os.path.join(self.index_root, CURRENT)
+        if not os.path.exists(link):
+            return False
+        path = os.path.realpath(link)
+        with self._lock:
+            if self._index is not None and self._index.path == path:
+                return False
+            self._index = RecipeIndex(path)
+            logger.info("Loaded recipe index %s", self._index.manifest)
+            return True
+
+    def index(self):
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            self._checked = now
+            try:
+                self.reload()
+            except (OSError, ValueError) as e:
+                logger.warning("Recipe index reload failed, keeping current version: %s", e)
+        return self._index
+
+    def recommend(self, ingredients, top_k: int = 5) -> list:
+        index = self.index()
+        if index is None:
+            return []
+        return index.recommend(ingredients, top_k)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "build":
+        sys.exit("usage: python recommender.py build <recipes.jsonl> <index_dir>")
+    print(f"Published {build_index(sys.argv[2], sys.argv[3])}")
@@ -0,0 +1,362 @@
+"""Shared-memory frame handoff between the API process and inference workers.
+
+The API process owns one shared memory segment split into fixed-size slots.
+A decoded frame is written into a free slot once. Only a small descriptor
+``(task_id, slot, shape, kwargs)`` goes over the worker's queue. The worker
+runs the handler on a view of the slot and writes its (much smaller) encoded
+result back into the same slot. The reply descriptor carries the result
+size and metadata.
+
+Slots are returned to the free list when the result has been read or the
+task failed. A monitor thread restarts crashed workers; their in-flight
+tasks fail with :class:`WorkerCrashed` and free their slots. Restarts back
+off exponentially while a worker keeps dying before it is ready (e.g. its
+initializer raises); after ``max_restarts`` such attempts the worker is given
+up and reported in :meth:`FrameWorkerPool.status`. A caller that stops
+waiting for a task hands it to :meth:`FrameWorkerPool.abandon`, which kills
+the worker as hung so its slots come back. Segments left behind by a dead
+API process are removed by :func:`cleanup_stale_segments`.
+"""
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "aisvc-frames-"
+SHM_DIR = "/dev/shm"
+MONITOR_INTERVAL = 1.0
+RESTART_BACKOFF = 1.0
+RESTART_BACKOFF_MAX = 60.0
+
+
+class WorkerCrashed(RuntimeError):
+    pass
+
+
+class NoWorkerAvailable(RuntimeError):
+    """Every worker is dead, waiting to be restarted or given up."""
+
+
+class ShmTooSmall(RuntimeError):
+    pass
+
+
+def check_shm_space(size: int, path: str = SHM_DIR):
+    """Refuse a segment larger than the free space of the shm filesystem.
+
+    Creating it would still succeed (the file is sparse), but touching pages
+    past the limit kills the process with SIGBUS. Docker's default /dev/shm
+    is 64 MB; raise it with ``shm_size``.
+    """
+    if not os.path.isdir(path):
+        return
+    stat = os.statvfs(path)
+    free = stat.f_bavail * stat.f_frsize
+    if size > free:
+        raise ShmTooSmall(
+            f"Frame ring needs {size / 2 ** 20:.0f} MB but {path} has {free / 2 ** 20:.0f} MB free; "
+            f"increase shm_size or lower SHM_SLOTS / SHM_SLOT_BYTES")
+
+
+class FrameRing:
+    """Fixed-size frame slots in one shared memory segment."""
+
+    def __init__(self, slots: int, slot_bytes: int):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        check_shm_space(slots * slot_bytes)
+        self.shm = shared_memory.SharedMemory(
+            name=f"{SEGMENT_PREFIX}{os.getpid()}-{id(self):x}", create=True, size=slots * slot_bytes)
+        self._free = queue.Queue()
+        for slot in range(slots):
+            self._free.put(slot)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def acquire(self, timeout: float = None) -> int:
+        """Take a free slot; raises ``queue.Empty`` after ``timeout``."""
+        return self._free.get(timeout=timeout)
+
+    def release(self, slot: int):
+        self._free.put(slot)
+
+    def write(self, slot: int, image: np.ndarray):
+        view = slot_view(self.shm, self.slot_bytes, slot, image.shape, image.dtype)
+        np.copyto(view, image)
+
+    def read_bytes(self, slot: int, nbytes: int) -> bytes:
+        offset = slot * self.slot_bytes
+        return bytes(self.shm.buf[offset:offset + nbytes])
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def slot_view(shm, slot_bytes: int, slot: int, shape, dtype=np.uint8) -> np.ndarray:
+    return np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=slot * slot_bytes)
+
+
+def cleanup_stale_segments():
+    """Unlink frame segments whose owning process no longer exists."""
+    if not os.path.isdir(SHM_DIR):
+        return
+    for name in os.listdir(SHM_DIR):
+        if not name.startswith(SEGMENT_PREFIX):
+            continue
+        try:
+            pid = int(name[len(SEGMENT_PREFIX):].split("-")[0])
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            try:
+                os.unlink(os.path.join(SHM_DIR, name))
+                logger.info("Removed stale frame segment %s", name)
+            except OSError:
+                pass
+        except (ValueError, PermissionError):
+            continue
+
+
+def _worker_main(worker_id, shm_name, slot_bytes, inbox, outbox, handler, initializer):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        if initializer is not None:
+            try:
+                initializer()
+            except Exception as e:
+                outbox.put((None, "init_error", worker_id, f"{type(e).__name__}: {e}"))
+                raise
+        outbox.put((None, "ready", worker_id, None))
+        while True:
+            task = inbox.get()
+            if task is None:
+                break
+            task_id, slot, shape, kwargs = task
+            try:
+                payload, meta = handler(slot_view(shm, slot_bytes, slot, shape), **kwargs)
+                if len(payload) <= slot_bytes:
+                    offset = slot * slot_bytes
+                    shm.buf[offset:offset + len(payload)] = payload
+                    outbox.put((task_id, "ok", len(payload), meta))
+                else:
+                    outbox.put((task_id, "ok", bytes(payload), meta))
+            except Exception as e:
+                outbox.put((task_id, "error", f"{type(e).__name__}: {e}", None))
+    finally:
+        shm.close()
+
+
+class _Worker:
+    def __init__(self, process, inbox, failures: int = 0, error: str = None):
+        self.process = process
+        self.inbox = inbox
+        self.in_flight = set()
+        self.ready = False
+        # Consecutive exits before becoming ready, and the last reported error
+        self.failures = failures
+        self.error = error
+        self.restart_at = None
+        self.failed = False
+
+    def accepts_tasks(self) -> bool:
+        return not self.failed and self.restart_at is None and self.process.is_alive()
+
+
+class FrameWorkerPool:
+    """Process pool running ``handler(frame, **kwargs) -> (bytes, meta)`` on shared frames.
+
+    ``handler`` and ``initializer`` must be importable module-level
+    functions (workers are started with the ``spawn`` method).
+    """
+
+    def __init__(self, handler, workers: int, slots: int, slot_bytes: int,
+                 initializer=None, slot_timeout: float = 5.0, max_restarts: int = 5):
+        self.handler = handler
+        self.initializer = initializer
+        self.workers = workers
+        self.slot_timeout = slot_timeout
+        self.max_restarts = max_restarts
+        self.ring = FrameRing(slots, slot_bytes)
+        self._ctx = mp.get_context("spawn")
+        self._outbox = self._ctx.Queue()
+        self._workers = {}
+        self._tasks = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.restarts = 0
+
+    def start(self):
+        for worker_id in range(self.workers):
+            self._spawn(worker_id)
+        threading.Thread(target=self._collect, name="frame-collector", daemon=True).start()
+        threading.Thread(target=self._monitor, name="frame-monitor", daemon=True).start()
+        return self
+
+    def _spawn(self, worker_id: int, failures: int = 0, error: str = None):
+        inbox = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self.ring.name, self.ring.slot_bytes, inbox, self._outbox,
+                  self.handler, self.initializer),
+            name=f"inference-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        self._workers[worker_id] = _Worker(process, inbox, failures, error)
+
+    def fits(self, image: np.ndarray) -> bool:
+        return image.nbytes <= self.ring.slot_bytes
+
+    def is_ready(self) -> bool:
+        """Every worker that has not been given up is ready (and at least one is)."""
+        workers = [w for w in self._workers.values() if not w.failed]
+        return bool(workers) and all(w.ready for w in workers)
+
+    def has_failed(self) -> bool:
+        """True once every worker has been given up."""
+        return bool(self._workers) and all(w.failed for w in self._workers.values())
+
+    def status(self) -> dict:
+        workers = list(self._workers.values())
+        return {
+            "workers": len(workers),
+            "ready": sum(w.ready for w in workers),
+            "failed": sum(w.failed for w in workers),
+            "restarts": self.restarts,
+            "errors": sorted({w.error for w in workers if w.error}),
+        }
+
+    def submit(self, image: np.ndarray, **kwargs) -> Future:
+        """Copy ``image`` into a slot and queue it; the future yields ``(bytes, meta)``."""
+        if not self.fits(image):
+            raise ValueError(f"Frame of {image.nbytes} bytes exceeds slot size {self.ring.slot_bytes}")
+        try:
+            slot = self.ring.acquire(timeout=self.slot_timeout)
+        except queue.Empty:
+            raise TimeoutError("No free frame slot") from None
+        self.ring.write(slot, image)
+
+        future = Future()
+        with self._lock:
+            candidates = [item for item in self._workers.items() if item[1].accepts_tasks()]
+            if not candidates:
+                self.ring.release(slot)
+                raise NoWorkerAvailable("No inference worker is running")
+            # Ready workers first; respawned ones may still be warming up
+            worker_id, worker = min(candidates, key=lambda item: (not item[1].ready, len(item[1].in_flight)))
+            task_id = next(self._ids)
+            worker.in_flight.add(task_id)
+            self._tasks[task_id] = (future, slot, worker_id)
+        future.task_id = task_id
+        worker.inbox.put((task_id, slot, image.shape, kwargs))
+        return future
+
+    def abandon(self, future: Future):
+        """Give up on a task whose result is no longer awaited (e.g. timed out).
+
+        The worker is presumed hung and killed; the monitor then fails its
+        in-flight tasks, frees their slots and restarts it.
+        """
+        with self._lock:
+            entry = self._tasks.get(future.task_id)
+            worker = self._workers.get(entry[2]) if entry is not None else None
+        if worker is not None and worker.process.is_alive():
+            logger.error("Inference worker %s did not finish task %s, killing it", entry[2], future.task_id)
+            worker.process.kill()
+
+    def _finish(self, task_id):
+        with self._lock:
+            entry = self._tasks.pop(task_id, None)
+            if entry is not None:
+                self._workers[entry[2]].in_flight.discard(task_id)
+        return entry
+
+    def _collect(self):
+        while not self._stopping.is_set():
+            try:
+                task_id, status, value, meta = self._outbox.get(timeout=MONITOR_INTERVAL)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            if status == "ready":
+                self._workers[value].ready = True
+                self._workers[value].error = None
+                continue
+            if status == "init_error":
+                logger.error("Inference worker %s failed to initialize: %s", value, meta)
+                self._workers[value].error = meta
+                continue
+
+            entry = self._finish(task_id)
+            if entry is None:
+                # Task was already failed by the crash monitor
+                continue
+            future, slot, _ = entry
+            try:
+                if status == "ok":
+                    payload = value if isinstance(value, bytes) else self.ring.read_bytes(slot, value)
+                    future.set_result((payload, meta))
+                else:
+                    future.set_exception(RuntimeError(value))
+            finally:
+                self.ring.release(slot)
+
+    def _restart_delay(self, failures: int) -> float:
+        return min(RESTART_BACKOFF * 2 ** (failures - 1), RESTART_BACKOFF_MAX)
+
+    def _monitor(self):
+        while not self._stopping.wait(MONITOR_INTERVAL):
+            now = time.monotonic()
+            for worker_id, worker in list(self._workers.items()):
+                if worker.failed or worker.process.is_alive():
+                    continue
+                if worker.restart_at is not None:
+                    if now >= worker.restart_at:
+                        with self._lock:
+                            self._spawn(worker_id, worker.failures, worker.error)
+                            self.restarts += 1
+                    continue
+
+                with self._lock:
+                    lost = [self._tasks.pop(task_id) for task_id in worker.in_flight if task_id in self._tasks]
+                    worker.in_flight.clear()
+                    # A worker that was serving starts a fresh count; one that
+                    # died while starting up backs off further each time
+                    worker.failures = 1 if worker.ready else worker.failures + 1
+                    worker.ready = False
+                    if worker.failures > self.max_restarts:
+                        worker.failed = True
+                    else:
+                        worker.restart_at = now + self._restart_delay(worker.failures)
+                if worker.failed:
+                    logger.error("Inference worker %s exited with code %s after %d failed starts, giving up",
+                                 worker_id, worker.process.exitcode, worker.failures)
+                else:
+                    logger.error("Inference worker %s exited with code %s, restarting in %.0fs",
+                                 worker_id, worker.process.exitcode, worker.restart_at - now)
+                for future, slot, _ in lost:
+                    future.set_exception(WorkerCrashed(f"Inference worker {worker_id} crashed"))
+                    self.ring.release(slot)
+
+    def stop(self):
+        self._stopping.set()
+        for worker in self._workers.values():
+            worker.inbox.put(None)
+        for worker in self._workers.values():
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.kill()
+        self.ring.close()
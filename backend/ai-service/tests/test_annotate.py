@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+import supervision as sv
+
+from yolo_detector.annotate import DetectionAnnotator
+
+
+def detections(xyxy) -> sv.Detections:
+    xyxy = np.array(xyxy, dtype=float)
+    return sv.Detections(
+        xyxy=xyxy,
+        class_id=np.zeros(len(xyxy), dtype=int),
+        data={"class_name": np.array(["tomato"] * len(xyxy))},
+    )
+
+
+@pytest.mark.parametrize("max_side", [0, 64])
+@pytest.mark.parametrize("box", [
+    [-5, -5, 15, 15],        # corner cut off at the top left
+    [90, 70, 130, 110],      # past the bottom right
+    [-50, 20, -10, 40],      # entirely to the left
+    [20, 200, 40, 240],      # entirely below
+    [-20, -20, 140, 120],    # larger than the image
+])
+def test_out_of_bounds_boxes(box, max_side):
+    image = np.zeros((100, 120, 3), dtype=np.uint8)
+    annotated = DetectionAnnotator(max_side=max_side).annotate(image, detections([box]))
+    assert annotated.shape[2] == 3
+    assert annotated.any()
+
+
+def test_boxes_are_clipped():
+    image = np.zeros((100, 120, 3), dtype=np.uint8)
+    annotator = DetectionAnnotator(thickness=1)
+    annotated = annotator.annotate(image, detections([[-30, 50, 60, 150]]))
+    color = annotator.color_for(0)
+    # The clipped left edge is drawn at x=0 and the bottom edge at the last row
+    assert tuple(annotated[60, 0]) == color
+    assert tuple(annotated[99, 30]) == color
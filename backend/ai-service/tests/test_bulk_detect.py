@@ -0,0 +1,23 @@
+import os
+
+from bulk_detect import annotated_path, list_directory
+
+
+def test_same_name_in_subdirectories_kept_apart(tmp_path):
+    root = tmp_path / "images"
+    for sub in ("a", "b"):
+        (root / sub).mkdir(parents=True)
+        (root / sub / "img1.jpg").write_bytes(b"")
+    (root / "a" / "img1.png").write_bytes(b"")
+    out = str(tmp_path / "annotated")
+    targets = [annotated_path(path, str(root), out) for path, _ in list_directory(str(root))]
+    assert len(set(targets)) == 3
+    assert sorted(os.path.relpath(t, out) for t in targets) == [
+        os.path.join("a", "img1.jpg"), os.path.join("a", "img1.png.jpg"), os.path.join("b", "img1.jpg"),
+    ]
+
+
+def test_path_outside_root_keeps_full_path(tmp_path):
+    out = str(tmp_path / "annotated")
+    target = annotated_path("/data/other/img1.JPG", str(tmp_path / "manifest"), out)
+    assert target == os.path.join(out, "data", "other", "img1.jpg")
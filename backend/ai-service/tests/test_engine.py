@@ -0,0 +1,54 @@
+import threading
+
+import numpy as np
+import pytest
+
+from yolo_detector import engine
+
+
+class EmptyModel:
+    def infer(self, image):
+        height, width = image.shape[:2]
+        return [{"predictions": [], "image": {"width": width, "height": height}}]
+
+
+@pytest.fixture(autouse=True)
+def fresh_engine(monkeypatch):
+    monkeypatch.setattr(engine, "_ready", threading.Event())
+    monkeypatch.setattr(engine, "stats", {})
+    monkeypatch.setattr(engine, "WARMUP_BACKOFF", 0)
+    monkeypatch.setattr(engine, "_model", None)
+
+
+def test_warm_up_retries_until_ready(monkeypatch):
+    calls = []
+
+    def flaky_warm_up():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("model download failed")
+        engine._mark_ready()
+
+    monkeypatch.setattr(engine, "warm_up", flaky_warm_up)
+    engine.warm_up_with_retry()
+    assert engine.is_ready()
+    assert len(calls) == 3 and engine.stats["warmup_attempts"] == 3
+
+
+def test_warm_up_gives_up_after_max_attempts(monkeypatch):
+    def failing_warm_up():
+        engine.stats["warmup_error"] = "model download failed"
+        raise RuntimeError("model download failed")
+
+    monkeypatch.setattr(engine, "warm_up", failing_warm_up)
+    engine.warm_up_with_retry(max_attempts=2)
+    assert not engine.is_ready()
+    assert engine.stats["warmup_attempts"] == 2
+
+
+def test_request_inference_marks_ready(monkeypatch):
+    monkeypatch.setattr(engine, "_model", EmptyModel())
+    engine.stats["warmup_error"] = "model download failed"
+    detections = engine.detect(np.zeros((32, 32, 3), dtype=np.uint8))
+    assert len(detections) == 0
+    assert engine.is_ready() and "warmup_error" not in engine.stats
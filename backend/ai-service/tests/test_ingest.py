@@ -0,0 +1,54 @@
+import cv2
+import numpy as np
+import pytest
+
+from ingest import IngestError, decode_image, read_dimensions
+
+
+def encode(ext: str, width: int = 64, height: int = 48, params=()) -> bytes:
+    image = np.random.default_rng(0).integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    ok, buffer = cv2.imencode(ext, image, list(params))
+    assert ok
+    return buffer.tobytes()
+
+
+def progressive_jpeg(width: int = 64, height: int = 48) -> bytes:
+    return encode(".jpg", width, height, (cv2.IMWRITE_JPEG_PROGRESSIVE, 1))
+
+
+@pytest.mark.parametrize("ext, fmt", [
+    (".jpg", "jpeg"),
+    (".png", "png"),
+    (".webp", "webp"),
+    (".bmp", "bmp"),
+])
+def test_read_dimensions(ext, fmt):
+    assert read_dimensions(encode(ext, 64, 48)) == (fmt, 64, 48)
+
+
+def test_read_dimensions_progressive_jpeg():
+    assert read_dimensions(progressive_jpeg(64, 48)) == ("jpeg-buffered", 64, 48)
+
+
+def test_read_dimensions_invalid():
+    assert read_dimensions(b"not an image") is None
+    assert read_dimensions(b"\xff\xd8\xff\xe0\x00\x10") is None
+
+
+def test_sequential_jpeg_over_decode_cap_is_reduced():
+    data = encode(".jpg", 400, 300)
+    image = decode_image(data, max_pixels=100 * 75, max_decode_pixels=200 * 150)
+    assert image.shape[:2] == (75, 100)
+
+
+def test_progressive_jpeg_over_decode_cap_is_refused():
+    data = progressive_jpeg(400, 300)
+    with pytest.raises(IngestError) as exc:
+        decode_image(data, max_pixels=100 * 75, max_decode_pixels=200 * 150)
+    assert exc.value.status_code == 413
+
+
+def test_progressive_jpeg_within_decode_cap_is_reduced():
+    data = progressive_jpeg(400, 300)
+    image = decode_image(data, max_pixels=100 * 75, max_decode_pixels=400 * 300)
+    assert image.shape[:2] == (75, 100)
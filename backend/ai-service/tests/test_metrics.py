@@ -0,0 +1,72 @@
+import math
+
+import numpy as np
+import pytest
+
+from yolo_detector.metrics import DetectionEvaluator, average_precision, load_yolo_labels, match_predictions
+
+
+def test_load_yolo_labels(tmp_path):
+    path = tmp_path / "image.txt"
+    path.write_text("0 0.5 0.5 0.2 0.4\n3 0.1 0.1 0.2 0.2\n")
+    cls, xyxy = load_yolo_labels(str(path), 100, 50)
+    assert cls.tolist() == [0, 3]
+    np.testing.assert_allclose(xyxy, [[40, 15, 60, 35], [0, 0, 20, 10]])
+
+
+def test_load_yolo_labels_missing_or_empty(tmp_path):
+    empty = tmp_path / "empty.txt"
+    empty.write_text("")
+    for path in (None, str(tmp_path / "missing.txt"), str(empty)):
+        cls, xyxy = load_yolo_labels(path, 100, 100)
+        assert cls.shape == (0,) and xyxy.shape == (0, 4)
+
+
+def test_match_predictions():
+    gt = [[0, 0, 10, 10], [20, 20, 40, 40]]
+    pred = [
+        [0, 0, 10, 10],    # exact match
+        [0, 0, 10, 10],    # duplicate of a matched box, lower score
+        [20, 20, 40, 40],  # right place, wrong class
+    ]
+    tp = match_predictions(pred, [0.9, 0.8, 0.7], [0, 0, 1], gt, [0, 0], 0.5)
+    assert tp.tolist() == [True, False, False]
+
+
+def test_match_prefers_higher_score():
+    tp = match_predictions([[0, 0, 10, 10], [0, 0, 10, 9]], [0.3, 0.9], [0, 0], [[0, 0, 10, 10]], [0], 0.5)
+    assert tp.tolist() == [False, True]
+
+
+@pytest.mark.parametrize("tp, scores, n_gt, expected", [
+    # Precision 1, 1/2, 2/3 at recall 1/2, 1/2, 1: 0.5 * 1 + 0.5 * 2/3
+    ([1, 0, 1], [0.9, 0.8, 0.7], 2, 0.5 + 1 / 3),
+    # Same predictions, scored in a different order
+    ([1, 1, 0], [0.7, 0.9, 0.8], 2, 0.5 + 1 / 3),
+    # Two of three objects found, no false positives
+    ([1, 1], [0.9, 0.8], 3, 2 / 3),
+    ([0, 0], [0.9, 0.8], 1, 0.0),
+    ([], [], 2, 0.0),
+])
+def test_average_precision(tp, scores, n_gt, expected):
+    ap = average_precision(np.array(tp, dtype=bool), np.array(scores, dtype=float), n_gt)
+    assert ap == pytest.approx(expected)
+
+
+def test_average_precision_without_ground_truth():
+    assert math.isnan(average_precision(np.array([True]), np.array([0.5]), 0))
+
+
+def test_evaluator_summary():
+    evaluator = DetectionEvaluator()
+    evaluator.add(
+        [[20, 20, 40, 40], [100, 100, 110, 110], [0, 0, 10, 7.2]],  # exact, false positive, IoU 0.72
+        [0.9, 0.8, 0.7], [0, 0, 0],
+        [[20, 20, 40, 40], [0, 0, 10, 10]], [0, 0],
+    )
+    summary = evaluator.summary()
+    assert summary["precision"] == 0.6667 and summary["recall"] == 1.0
+    assert summary["map50"] == 0.8333
+    # AP 5/6 at IoU 0.50-0.70, 1/2 at 0.75-0.95 (the 0.72 box no longer matches)
+    assert summary["map50_95"] == 0.6667
+    assert summary["ap50_per_class"] == {"0": 0.8333}
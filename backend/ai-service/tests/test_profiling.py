@@ -0,0 +1,53 @@
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import profiling
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUTH_SERVICE_COPY = os.path.join(SERVICE_DIR, "..", "auth-service", "profiling.py")
+TOKEN = "s3cret"
+
+
+def client(every_n: int = 0) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/work")
+    def work():
+        return {"ok": True}
+
+    profiling.install(app, "/admin", TOKEN, every_n=every_n)
+    return TestClient(app)
+
+
+def test_auth_service_copy_is_identical():
+    # ai-service's profiling.py is canonical; copy it over after changing it
+    with open(os.path.join(SERVICE_DIR, "profiling.py"), "rb") as f, open(AUTH_SERVICE_COPY, "rb") as g:
+        assert f.read() == g.read(), "backend/auth-service/profiling.py differs from the ai-service copy"
+
+
+def test_token_matches():
+    assert profiling.token_matches(TOKEN, TOKEN)
+    assert profiling.token_matches(TOKEN.encode(), TOKEN)
+    assert not profiling.token_matches("wrong", TOKEN)
+    assert not profiling.token_matches(None, TOKEN)
+    assert not profiling.token_matches("", "")
+
+
+def test_marked_request_is_profiled():
+    c = client()
+    response = c.get("/work", headers={"X-Profile": TOKEN})
+    profile_id = response.headers["X-Profile-Id"]
+    listed = c.get("/admin/profiles", headers={"X-Admin-Token": TOKEN}).json()
+    assert listed["running"] is False
+    assert [p["id"] for p in listed["profiles"]] == [profile_id]
+    folded = c.get(f"/admin/profiles/{profile_id}", headers={"X-Admin-Token": TOKEN})
+    assert folded.status_code == 200
+
+
+def test_wrong_tokens_are_rejected():
+    c = client()
+    assert "X-Profile-Id" not in c.get("/work", headers={"X-Profile": "wrong"}).headers
+    assert c.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert c.get("/admin/profiles").status_code == 403
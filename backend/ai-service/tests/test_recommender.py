@@ -0,0 +1,84 @@
+import json
+import os
+
+import pytest
+
+import recommender as recommender_module
+from recommender import CURRENT, Recommender, build_index
+
+RECIPES = [
+    {"id": "salad", "title": "Tomato salad", "ingredients": ["Tomato", "onion", "olive_oil"]},
+    {"id": "omelette", "title": "Omelette", "ingredients": ["egg", "tomato", "onion", "cheese"]},
+    {"id": "toast", "title": "Cheese toast", "ingredients": ["bread", "cheese"]},
+    {"id": "empty", "title": "Nothing", "ingredients": []},
+]
+
+
+def write_corpus(path, recipes) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        for recipe in recipes:
+            f.write(json.dumps(recipe) + "\n")
+        f.write("\n")
+    return str(path)
+
+
+@pytest.fixture
+def index_root(tmp_path):
+    root = tmp_path / "index"
+    root.mkdir()
+    build_index(write_corpus(tmp_path / "recipes.jsonl", RECIPES), str(root))
+    return root
+
+
+def test_round_trip(index_root):
+    recommender = Recommender(str(index_root))
+    results = recommender.recommend(["tomato", "Onion"], top_k=5)
+    assert [r["id"] for r in results] == ["salad", "omelette"]
+    # Jaccard: salad 2/3, omelette 2/4
+    assert [r["score"] for r in results] == [0.6667, 0.5]
+    assert results[0]["matched"] == 2 and results[0]["missing"] == 1
+
+
+def test_top_k_and_unknown_ingredients(index_root):
+    recommender = Recommender(str(index_root))
+    assert [r["id"] for r in recommender.recommend(["cheese"], top_k=1)] == ["toast"]
+    assert recommender.recommend(["durian"]) == []
+    assert recommender.recommend(["cheese"], top_k=0) == []
+
+
+def test_reload_picks_up_new_version(index_root, tmp_path, monkeypatch):
+    recommender = Recommender(str(index_root), check_interval=0)
+    assert recommender.index().manifest["recipes"] == 3
+    # Versions are named by the second; give the rebuild a later one
+    monkeypatch.setattr(recommender_module.time, "strftime", lambda fmt: "v29991231235959")
+    corpus = write_corpus(tmp_path / "more.jsonl", RECIPES + [{"id": "eggs", "ingredients": ["egg"]}])
+    build_index(corpus, str(index_root))
+    assert recommender.index().manifest["recipes"] == 4
+    assert recommender.recommend(["egg"], top_k=1)[0]["id"] == "eggs"
+
+
+def test_corrupt_index_keeps_serving(index_root):
+    recommender = Recommender(str(index_root), check_interval=0)
+    loaded = recommender.index()
+    current = os.path.realpath(index_root / CURRENT)
+    broken = index_root / "v99999999999999-0"
+    broken.mkdir()
+    (broken / "manifest.json").write_text("{")
+    os.replace(str(index_root / CURRENT), str(index_root / "old-link"))
+    os.symlink(broken.name, str(index_root / CURRENT))
+    with pytest.raises(OSError):
+        recommender.reload()
+    assert recommender.index() is loaded and loaded.path == current
+
+
+def test_startup_survives_corrupt_index(tmp_path, monkeypatch):
+    import main
+
+    root = tmp_path / "index"
+    (root / "v1").mkdir(parents=True)
+    os.symlink("v1", str(root / CURRENT))
+    monkeypatch.setattr(main, "recipe_recommender", Recommender(str(root)))
+    monkeypatch.setattr(main, "WARMUP_ON_STARTUP", False)
+    monkeypatch.setattr(main, "INFERENCE_WORKERS", 0)
+    main.start_warm_up()
+    assert main.recipe_recommender.recommend(["tomato"]) == []
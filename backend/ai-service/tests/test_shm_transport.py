@@ -0,0 +1,101 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+import shm_transport
+from shm_transport import FrameWorkerPool, NoWorkerAvailable
+
+FRAME = np.zeros((8, 8, 3), dtype=np.uint8)
+
+
+# Module-level: workers are spawned and import these by name
+def echo(frame, delay: float = 0.0):
+    time.sleep(delay)
+    return frame.tobytes()[:4], {"pid": os.getpid()}
+
+
+def failing_initializer():
+    raise RuntimeError("model download failed")
+
+
+def wait_for(condition, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.05)
+
+
+@pytest.fixture(autouse=True)
+def fast_monitor(monkeypatch):
+    monkeypatch.setattr(shm_transport, "MONITOR_INTERVAL", 0.05)
+    monkeypatch.setattr(shm_transport, "RESTART_BACKOFF", 0.05)
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(**kwargs):
+        kwargs.setdefault("workers", 1)
+        kwargs.setdefault("slots", 2)
+        pool = FrameWorkerPool(echo, slot_bytes=FRAME.nbytes, **kwargs).start()
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.stop()
+
+
+def test_round_trip(make_pool):
+    pool = make_pool()
+    wait_for(pool.is_ready)
+    payload, meta = pool.submit(FRAME).result(timeout=10)
+    assert payload == b"\0\0\0\0" and meta["pid"] != os.getpid()
+
+
+def test_failing_initializer_backs_off_and_gives_up(make_pool):
+    pool = make_pool(initializer=failing_initializer, max_restarts=2)
+    wait_for(pool.has_failed)
+    status = pool.status()
+    assert status["failed"] == 1 and status["restarts"] == 2
+    assert status["errors"] == ["RuntimeError: model download failed"]
+    assert not pool.is_ready()
+    with pytest.raises(NoWorkerAvailable):
+        pool.submit(FRAME)
+    # The slot taken by the rejected submit went back to the free list
+    assert pool.ring._free.qsize() == 2
+
+
+def test_submit_prefers_ready_workers(make_pool):
+    pool = make_pool(workers=2, slots=4)
+    wait_for(pool.is_ready)
+    pool._workers[1].ready = False
+    pids = {pool.submit(FRAME).result(timeout=10)[1]["pid"] for _ in range(4)}
+    assert pids == {pool._workers[0].process.pid}
+
+
+def test_abandon_kills_hung_worker_and_frees_slot(make_pool):
+    pool = make_pool(slots=1)
+    wait_for(pool.is_ready)
+    future = pool.submit(FRAME, delay=60)
+    with pytest.raises(TimeoutError):
+        future.result(timeout=0.2)
+    pool.abandon(future)
+    with pytest.raises(shm_transport.WorkerCrashed):
+        future.result(timeout=10)
+    wait_for(pool.is_ready)
+    assert pool.submit(FRAME).result(timeout=10)[0] == b"\0\0\0\0"
+
+
+def test_ring_larger_than_free_shm_is_refused(monkeypatch):
+    class Stat:
+        f_bavail = 16
+        f_frsize = 2 ** 20
+
+    monkeypatch.setattr(shm_transport.os, "statvfs", lambda path: Stat)
+    monkeypatch.setattr(shm_transport.os.path, "isdir", lambda path: True)
+    with pytest.raises(shm_transport.ShmTooSmall, match="needs 32 MB"):
+        shm_transport.FrameRing(slots=2, slot_bytes=16 * 2 ** 20)
@@ -0,0 +1,43 @@
+import pytest
+
+from text_screen import DEFAULT_KEYWORDS, SMALL_KEYWORD_SET, KeywordClassifier
+
+FILLER = [f"filler{i:02d}" for i in range(SMALL_KEYWORD_SET + 8)]
+
+MESSAGES = [
+    "you are a winner",
+    "Click here to WIN a free prize!!!",
+    "urgent: invoice overdue, action required",
+    "limited offer: 50% off, best deal",
+    "spam spammer spamming",
+    "hello, see you tomorrow",
+    "",
+]
+
+
+def classifiers(keywords: dict):
+    """The same keywords through the substring path and the regex path."""
+    small = KeywordClassifier(keywords)
+    large = KeywordClassifier({**keywords, "filler": FILLER})
+    assert small._regex is None and large._regex is not None
+    return small, large
+
+
+@pytest.mark.parametrize("text", MESSAGES)
+def test_substring_and_regex_paths_agree(text):
+    keywords = {**DEFAULT_KEYWORDS, "spam": DEFAULT_KEYWORDS["spam"] + ["winner", "spammer"]}
+    small, large = classifiers(keywords)
+    assert small.matches(text) == large.matches(text)
+    assert small.classify(text) == large.classify(text)
+
+
+def test_overlapping_keywords_all_counted():
+    small, large = classifiers({"spam": ["win", "winner"]})
+    for classifier in (small, large):
+        assert classifier.matches("you are a winner") == {"win", "winner"}
+        assert classifier.classify("you are a winner")["confidence"] == 0.4
+
+
+def test_no_match_is_normal():
+    _, large = classifiers(DEFAULT_KEYWORDS)
+    assert large.classify("see you tomorrow") == {"is_spam": False, "confidence": 0, "category": "normal"}
@@ -0,0 +1,92 @@
+import numpy as np
+
+from yolo_detector.tiling import box_ios, infer_tiled, nms, touches_interior_border
+
+
+class SceneModel:
+    """Detects fixed objects (image xyxy) wherever they are visible in the input.
+
+    Pixels hold their own image coordinates, so a tile view reveals its origin.
+    """
+
+    def __init__(self, objects, confidence_of_cut=0.9, confidence=0.8):
+        self.objects = objects
+        self.confidence_of_cut = confidence_of_cut
+        self.confidence = confidence
+
+    def _predict(self, tile):
+        ox, oy = int(tile[0, 0, 0]), int(tile[0, 0, 1])
+        th, tw = tile.shape[:2]
+        predictions = []
+        for x1, y1, x2, y2 in self.objects:
+            vx1, vy1 = max(x1, ox), max(y1, oy)
+            vx2, vy2 = min(x2, ox + tw), min(y2, oy + th)
+            if vx1 >= vx2 or vy1 >= vy2:
+                continue
+            whole = (vx1, vy1, vx2, vy2) == (x1, y1, x2, y2)
+            predictions.append({
+                "x": (vx1 + vx2) / 2 - ox, "y": (vy1 + vy2) / 2 - oy,
+                "width": vx2 - vx1, "height": vy2 - vy1,
+                "confidence": self.confidence if whole else self.confidence_of_cut,
+                "class": "tomato", "class_id": 0, "detection_id": f"{ox}-{oy}-{x1}",
+            })
+        return {"predictions": predictions, "image": {"width": tw, "height": th}}
+
+    def infer(self, images):
+        images = images if isinstance(images, list) else [images]
+        return [self._predict(image) for image in images]
+
+
+def coordinate_image(width: int, height: int) -> np.ndarray:
+    image = np.zeros((height, width, 3), dtype=np.int32)
+    image[..., 0] = np.arange(width)[None, :]
+    image[..., 1] = np.arange(height)[:, None]
+    return image
+
+
+def test_cut_off_box_merges_with_full_object():
+    # Tiles start at x=0 and x=360; the first sees only 150 px of the 400 px object
+    image = coordinate_image(1000, 640)
+    model = SceneModel([(490, 100, 890, 300)])
+    for include_full in (True, False):
+        detections = infer_tiled(model, image, tile_size=640, overlap=0.2, workers=2,
+                                 include_full=include_full)
+        assert len(detections) == 1
+        np.testing.assert_allclose(detections.xyxy[0], [490, 100, 890, 300])
+
+
+def test_object_only_seen_cut_off_is_kept_once():
+    # Wider than a tile: every view is cut, and the views overlap in the tile overlap
+    image = coordinate_image(1000, 640)
+    detections = infer_tiled(SceneModel([(100, 100, 900, 300)]), image, tile_size=640,
+                             overlap=0.2, include_full=False)
+    assert len(detections) == 1
+
+
+def test_separate_objects_are_kept():
+    image = coordinate_image(1000, 640)
+    objects = [(20, 20, 120, 120), (490, 100, 890, 300), (700, 400, 760, 460)]
+    detections = infer_tiled(SceneModel(objects), image, tile_size=640, overlap=0.2, batch=True)
+    assert len(detections) == 3
+
+
+def test_box_ios():
+    inner = np.array([[10, 10, 20, 20]], dtype=float)
+    outer = np.array([[0, 0, 40, 40]], dtype=float)
+    assert box_ios(inner, outer)[0, 0] == 1.0
+    assert box_ios(outer, np.array([[30, 30, 50, 50]], dtype=float))[0, 0] == 0.25
+
+
+def test_touches_interior_border():
+    boxes = np.array([[500, 10, 640, 50], [10, 10, 100, 100], [0, 0, 50, 50]], dtype=float)
+    cut = touches_interior_border(boxes, (0, 0, 640, 640), (1000, 640))
+    assert cut.tolist() == [True, False, False]
+
+
+def test_nms_rank_prefers_untouched_box():
+    xyxy = np.array([[0, 0, 150, 100], [0, 0, 400, 100]], dtype=float)
+    scores = np.array([0.9, 0.8])
+    assert nms(xyxy, scores, metric="ios").tolist() == [0]
+    assert nms(xyxy, scores, metric="ios", rank=np.array([1, 0])).tolist() == [1]
+    # Plain IoU (0.375) keeps both
+    assert sorted(nms(xyxy, scores).tolist()) == [0, 1]
@@ -0,0 +1,127 @@
+"""Keyword based text screening used by /ai/detect.
+
+Keywords are grouped by category and loaded from TEXT_KEYWORDS_FILE (JSON,
+``{"category": ["keyword", ...]}``) or the built-in defaults. All keywords
+are compiled into one trie-shaped regular expression, so a message is
+scanned once no matter how many keywords there are (small lists use plain
+substring search, which is faster at that size). Matching is a
+case-insensitive substring match, like the original per-keyword check: both
+paths report every keyword found, including overlapping ones ("win" and
+"winner" in "winner").
+"""
+import json
+import re
+from functools import lru_cache
+
+DEFAULT_KEYWORDS = {
+    "spam": ["spam", "free", "win", "click here", "congratulations"],
+    "promotional": ["sale", "discount", "% off", "limited offer", "deal"],
+    "important": ["urgent", "important", "deadline", "invoice", "action required"],
+}
+# Category precedence when scores tie; "spam" always wins when matched
+CATEGORY_ORDER = ["spam", "important", "promotional"]
+SCORE_PER_KEYWORD = 0.2
+# Below this many keywords, per-keyword substring search (done in C) is
+# faster than a regex scan of every position
+SMALL_KEYWORD_SET = 32
+
+
+def _trie_regex(keywords) -> str:
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node) -> str:
+        if len(node) == 1 and "" in node:
+            return ""
+        branches, chars = [], []
+        for char in sorted(key for key in node if key):
+            tail = build(node[char])
+            if tail:
+                branches.append(re.escape(char) + tail)
+            else:
+                chars.append(re.escape(char))
+        if chars:
+            branches.append(chars[0] if len(chars) == 1 else "[" + "".join(chars) + "]")
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # Greedy optional tail: the longest keyword at a position wins
+            pattern = "(?:" + pattern + ")?"
+        return pattern
+
+    return build(trie)
+
+
+class KeywordClassifier:
+    """Compiled multi-keyword matcher with deterministic scoring."""
+
+    def __init__(self, keywords: dict):
+        self.category_of = {}
+        for category, words in keywords.items():
+            for word in words:
+                word = word.lower()
+                if word:
+                    self.category_of.setdefault(word, category)
+        self.categories = list(keywords)
+        self.precedence = {
+            category: i for i, category in enumerate(
+                CATEGORY_ORDER + [c for c in self.categories if c not in CATEGORY_ORDER])
+        }
+        self._regex = None
+        if len(self.category_of) > SMALL_KEYWORD_SET:
+            # Lookahead so overlapping keywords are all found
+            self._regex = re.compile(f"(?=({_trie_regex(self.category_of)}))")
+            # The regex reports the longest keyword at each position; the
+            # shorter ones starting there are its prefixes ("win" in "winner")
+            self._prefixes = {
+                keyword: [keyword[:i] for i in range(1, len(keyword) + 1) if keyword[:i] in self.category_of]
+                for keyword in self.category_of
+            }
+
+    @classmethod
+    def from_file(cls, path: str) -> "KeywordClassifier":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def matches(self, text: str) -> set:
+        """Distinct keywords contained in ``text``."""
+        text = text.lower()
+        if self._regex is None:
+            return {keyword for keyword in self.category_of if keyword in text}
+        found = set()
+        for longest in {m.group(1) for m in self._regex.finditer(text)}:
+            found.update(self._prefixes[longest])
+        return found
+
+    def classify(self, text: str) -> dict:
+        scores = {}
+        for keyword in self.matches(text):
+            category = self.category_of[keyword]
+            scores[category] = scores.get(category, 0) + 1
+
+        is_spam = "spam" in scores
+        if is_spam:
+            category = "spam"
+        elif scores:
+            category = min(scores, key=lambda c: (-scores[c], self.precedence[c]))
+        else:
+            category = "normal"
+        return {
+            "is_spam": is_spam,
+            "confidence": round(min(scores.get(category, 0) * SCORE_PER_KEYWORD, 1.0), 4),
+            "category": category,
+        }
+
+    def classify_many(self, texts) -> list:
+        return [self.classify(text) for text in texts]
+
+
+@lru_cache(maxsize=1)
+def get_classifier(path: str = None) -> KeywordClassifier:
+    """Shared classifier, built once from ``path`` or the defaults."""
+    if path:
+        return KeywordClassifier.from_file(path)
+    return KeywordClassifier(DEFAULT_KEYWORDS)
@@ -0,0 +1,119 @@
+"""Annotation of detection results.
+
+Annotators are built once per configuration and reused across requests.
+The class color palette is precomputed and the rendered label patch
+(background + text) of every class name is cached, so drawing a label is a
+single array copy instead of a text layout + rasterisation per box.
+"""
+from functools import lru_cache
+
+import cv2
+import numpy as np
+import supervision as sv
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+LABEL_PADDING = 4
+# Label patches are small; the cache is bounded to guard against unbounded class names
+LABEL_CACHE_SIZE = 512
+
+
+def _palette_bgr(palette: sv.ColorPalette) -> np.ndarray:
+    return np.array([color.as_bgr() for color in palette.colors], dtype=np.uint8)
+
+
+def _text_color(background_bgr) -> tuple:
+    b, g, r = (int(c) for c in background_bgr)
+    luminance = 0.299 * r + 0.587 * g + 0.114 * b
+    return (0, 0, 0) if luminance > 150 else (255, 255, 255)
+
+
+class DetectionAnnotator:
+    """Draws boxes and class labels with a fixed style.
+
+    Use :func:`get_annotator` instead of instantiating directly so that
+    the palette and label cache are shared between requests.
+    """
+
+    def __init__(self, thickness: int = 2, text_scale: float = 0.5,
+                 text_thickness: int = 1, max_side: int = 0):
+        self.thickness = thickness
+        self.text_scale = text_scale
+        self.text_thickness = text_thickness
+        self.max_side = max_side
+        self.palette = _palette_bgr(sv.ColorPalette.DEFAULT)
+        self._label_patch = lru_cache(maxsize=LABEL_CACHE_SIZE)(self._render_label)
+
+    def color_for(self, class_id: int) -> tuple:
+        return tuple(int(c) for c in self.palette[class_id % len(self.palette)])
+
+    def _render_label(self, text: str, class_id: int) -> np.ndarray:
+        color = self.color_for(class_id)
+        (w, h), baseline = cv2.getTextSize(text, FONT, self.text_scale, self.text_thickness)
+        patch = np.empty((h + baseline + 2 * LABEL_PADDING, w + 2 * LABEL_PADDING, 3), dtype=np.uint8)
+        patch[:] = color
+        cv2.putText(patch, text, (LABEL_PADDING, LABEL_PADDING + h), FONT,
+                    self.text_scale, _text_color(color), self.text_thickness, cv2.LINE_AA)
+        patch.setflags(write=False)
+        return patch
+
+    def label_cache_info(self):
+        return self._label_patch.cache_info()
+
+    def _scene(self, image: np.ndarray):
+        """Return the image to draw on and the box scale factor."""
+        height, width = image.shape[:2]
+        longest = max(height, width)
+        if not self.max_side or longest <= self.max_side:
+            return image, 1.0
+        scale = self.max_side / longest
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA), scale
+
+    def annotate(self, image: np.ndarray, detections: sv.Detections, labels=None) -> np.ndarray:
+        """Annotate ``image`` with ``detections``.
+
+        Draws in place when no downscaling is needed, otherwise on a
+        downscaled copy (the input is left untouched).
+        """
+        scene, scale = self._scene(image)
+        if len(detections) == 0:
+            return scene
+
+        if labels is None:
+            labels = detections.data.get("class_name")
+            if labels is None:
+                labels = [str(c) for c in detections.class_id]
+        class_ids = detections.class_id
+        if class_ids is None:
+            class_ids = np.zeros(len(detections), dtype=int)
+
+        height, width = scene.shape[:2]
+        boxes = np.round(detections.xyxy * scale).astype(np.int32)
+        # Basic slices are views, so this clips in place (fancy indexing would copy)
+        np.clip(boxes[:, 0::2], 0, width - 1, out=boxes[:, 0::2])
+        np.clip(boxes[:, 1::2], 0, height - 1, out=boxes[:, 1::2])
+        boxes = boxes.tolist()
+        class_ids = np.asarray(class_ids).tolist()
+
+        for (x1, y1, x2, y2), class_id in zip(boxes, class_ids):
+            cv2.rectangle(scene, (x1, y1), (x2, y2), self.color_for(class_id), self.thickness)
+
+        for (x1, y1, _, _), class_id, label in zip(boxes, class_ids, labels):
+            patch = self._label_patch(str(label), class_id)
+            ph, pw = patch.shape[:2]
+            # Place above the box, or inside it when there is no room at the top
+            top = y1 - ph if y1 - ph >= 0 else y1
+            top = min(max(top, 0), height - 1)
+            x1 = min(max(x1, 0), width - 1)
+            bottom = min(top + ph, height)
+            right = min(x1 + pw, width)
+            scene[top:bottom, x1:right] = patch[:bottom - top, :right - x1]
+
+        return scene
+
+
+@lru_cache(maxsize=8)
+def get_annotator(thickness: int = 2, text_scale: float = 0.5,
+                  text_thickness: int = 1, max_side: int = 0) -> DetectionAnnotator:
+    """Return the shared annotator for a configuration."""
+    return DetectionAnnotator(thickness, text_scale, text_thickness, max_side)
@@ -0,0 +1,220 @@
+"""Detection pipeline used by ai-service.
+
+``inference``, ``supervision`` and ``cv2`` are imported on first use rather
+than at module load, so the API process starts quickly and the model is
+loaded either by the start-up warm-up or by the first request. Model
+artifacts are kept in MODEL_CACHE_DIR, which ``inference`` reads at import
+time: they are downloaded once and loaded from disk on later starts. With
+MODEL_VARIANT set, an optimized variant of the weights is built into the
+same cache on first load (see ``yolo_detector.optimize``) and used instead.
+
+Prefetch the artifacts and build the variant (e.g. into a mounted volume) with:
+
+    python -m yolo_detector.engine
+"""
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from config import (
+    YOLO_MODEL_DETECTOR, MODEL_CACHE_DIR, MODEL_VARIANT, MODEL_CALIBRATION_DIR, WARMUP_MAX_ATTEMPTS,
+    ANNOTATION_MAX_SIDE, ANNOTATION_THICKNESS, ANNOTATION_TEXT_SCALE, TILE_SIZE, TILE_OVERLAP, TILE_WORKERS, TILE_BATCH, TILE_NMS_IOU,
+)
+
+logger = logging.getLogger(__name__)
+
+# Timings (seconds) of the start-up phases, reported by /ai/ready
+stats = {}
+
+_model = None
+_model_lock = threading.Lock()
+_ready = threading.Event()
+# Delay before the next warm-up attempt doubles up to this many seconds
+WARMUP_BACKOFF = 2.0
+WARMUP_BACKOFF_MAX = 60.0
+
+
+def _timed(key: str, start: float):
+    stats[key] = round(time.perf_counter() - start, 4)
+
+
+def _mark_ready():
+    if not _ready.is_set():
+        stats.pop("warmup_error", None)
+        _ready.set()
+
+
+def load_model():
+    """Return the detector model, loading it on first call."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
+                os.environ.setdefault("MODEL_CACHE_DIR", MODEL_CACHE_DIR)
+
+                start = time.perf_counter()
+                from inference import get_model
+                import supervision  # noqa: F401
+                import cv2  # noqa: F401
+                _timed("import_s", start)
+
+                start = time.perf_counter()
+                model = get_model(model_id=YOLO_MODEL_DETECTOR)
+                _timed("model_load_s", start)
+                if MODEL_VARIANT != "stock":
+                    _apply_variant(model)
+                _model = model
+    return _model
+
+
+def _apply_variant(model):
+    from yolo_detector.optimize import apply_variant
+
+    start = time.perf_counter()
+    try:
+        apply_variant(model, MODEL_VARIANT, MODEL_CACHE_DIR, MODEL_CALIBRATION_DIR)
+        stats["model_variant"] = MODEL_VARIANT
+        stats.pop("model_variant_error", None)
+    except Exception as e:
+        # The stock session is still in place; serve with it rather than fail
+        logger.warning("Model variant %s unavailable, using stock weights: %s", MODEL_VARIANT, e)
+        stats["model_variant"] = "stock"
+        stats["model_variant_error"] = str(e)
+    _timed("model_variant_s", start)
+
+
+def decode_image(data: bytes):
+    """Decode an encoded image to a BGR array, ``None`` if invalid."""
+    import cv2
+
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def encode_jpeg(image: np.ndarray) -> bytes:
+    import cv2
+
+    _, buffer = cv2.imencode(".jpg", image)
+    return buffer.tobytes()
+
+
+def detect(image: np.ndarray, tiled: bool = False):
+    """Run the detector on ``image`` and return ``sv.Detections``."""
+    import supervision as sv
+
+    model = load_model()
+    if tiled:
+        from yolo_detector.tiling import infer_tiled
+
+        detections = infer_tiled(
+            model, image,
+            tile_size=TILE_SIZE,
+            overlap=TILE_OVERLAP,
+            workers=TILE_WORKERS,
+            batch=TILE_BATCH,
+            iou_threshold=TILE_NMS_IOU,
+        )
+    else:
+        detections = sv.Detections.from_inference(model.infer(image)[0])
+    # A served inference proves the model usable, even if warm-up failed
+    _mark_ready()
+    return detections
+
+
+def detect_batch(images: list, tiled: bool = False) -> list:
+    """Run the detector on several images in one model call (per image when tiled)."""
+    import supervision as sv
+
+    if tiled:
+        return [detect(image, tiled=True) for image in images]
+    model = load_model()
+    detections = [sv.Detections.from_inference(result) for result in model.infer(images)]
+    _mark_ready()
+    return detections
+
+
+def detection_labels(detections) -> list:
+    labels = detections.data.get("class_name", [])
+    if isinstance(labels, np.ndarray):
+        labels = labels.tolist()
+    return labels
+
+
+def annotate(image: np.ndarray, detections, labels=None) -> np.ndarray:
+    from yolo_detector.annotate import get_annotator
+
+    annotator = get_annotator(
+        thickness=ANNOTATION_THICKNESS,
+        text_scale=ANNOTATION_TEXT_SCALE,
+        max_side=ANNOTATION_MAX_SIDE,
+    )
+    return annotator.annotate(image, detections, labels=labels)
+
+
+def detect_frame(image: np.ndarray, tiled: bool = False):
+    """Full pipeline for one frame: detect, annotate and encode.
+
+    Returns ``(jpeg_bytes, labels)``. Annotation may draw into ``image``.
+    """
+    detections = detect(image, tiled=tiled)
+    labels = detection_labels(detections)
+    return encode_jpeg(annotate(image, detections, labels=labels)), labels
+
+
+def warm_up():
+    """Load the model and run one inference on a synthetic image.
+
+    Marks the engine ready on success; failures are recorded in ``stats`` and
+    raised. The first successful inference of a request marks it ready too.
+    """
+    start = time.perf_counter()
+    try:
+        image = np.random.default_rng(0).integers(0, 255, size=(640, 640, 3), dtype=np.uint8)
+        load_model()
+        infer_start = time.perf_counter()
+        detections = detect(image)
+        annotate(image, detections, detection_labels(detections))
+        _timed("warmup_inference_s", infer_start)
+    except Exception as e:
+        stats["warmup_error"] = str(e)
+        raise
+    finally:
+        _timed("warmup_total_s", start)
+    _mark_ready()
+
+
+def warm_up_with_retry(max_attempts: int = WARMUP_MAX_ATTEMPTS):
+    """:func:`warm_up`, retried with exponential backoff (``max_attempts`` 0 = until ready).
+
+    Stops early once a request has loaded the model and served an inference.
+    """
+    delay = WARMUP_BACKOFF
+    attempt = 0
+    while not _ready.is_set():
+        attempt += 1
+        stats["warmup_attempts"] = attempt
+        try:
+            warm_up()
+            return
+        except Exception as e:
+            if max_attempts and attempt >= max_attempts:
+                logger.error("Warm-up failed after %d attempts: %s", attempt, e)
+                return
+            logger.warning("Warm-up attempt %d failed (%s), retrying in %.0fs", attempt, e, delay)
+        time.sleep(delay)
+        delay = min(delay * 2, WARMUP_BACKOFF_MAX)
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    warm_up()
+    print(f"Model {YOLO_MODEL_DETECTOR} cached in {MODEL_CACHE_DIR}: {stats}")
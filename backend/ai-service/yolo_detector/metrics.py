@@ -0,0 +1,107 @@
+"""Detection quality metrics: precision, recall and mAP against YOLO labels."""
+import os
+
+import numpy as np
+
+from yolo_detector.tiling import box_iou
+
+MAP_IOU_THRESHOLDS = np.round(np.arange(0.5, 0.96, 0.05), 2)
+
+
+def load_yolo_labels(label_path: str, width: int, height: int):
+    """Read a YOLO label file (``class cx cy w h``, normalised).
+
+    Returns ``(class_ids, xyxy)`` in pixel coordinates of a ``width`` x
+    ``height`` image; empty arrays when the file is missing or empty.
+    """
+    empty = np.empty(0, dtype=int), np.empty((0, 4))
+    # Empty files (images without objects) are common; loadtxt would warn on each
+    if not label_path or not os.path.exists(label_path) or os.path.getsize(label_path) == 0:
+        return empty
+    rows = np.loadtxt(label_path, ndmin=2)
+    if rows.size == 0:
+        return empty
+    cx, cy = rows[:, 1] * width, rows[:, 2] * height
+    bw, bh = rows[:, 3] * width, rows[:, 4] * height
+    xyxy = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+    return rows[:, 0].astype(int), xyxy
+
+
+def match_predictions(pred_xyxy, pred_scores, pred_cls, gt_xyxy, gt_cls, iou_threshold: float):
+    """Greedy per-class matching; returns a true-positive flag per prediction."""
+    tp = np.zeros(len(pred_xyxy), dtype=bool)
+    if len(pred_xyxy) == 0 or len(gt_xyxy) == 0:
+        return tp
+    iou = box_iou(np.asarray(pred_xyxy, dtype=float), np.asarray(gt_xyxy, dtype=float))
+    iou[np.asarray(pred_cls)[:, None] != np.asarray(gt_cls)[None, :]] = 0
+    taken = np.zeros(len(gt_xyxy), dtype=bool)
+    for i in np.argsort(-np.asarray(pred_scores), kind="stable"):
+        candidates = np.where(taken, 0, iou[i])
+        j = int(np.argmax(candidates))
+        if candidates[j] >= iou_threshold:
+            tp[i] = taken[j] = True
+    return tp
+
+
+def average_precision(tp: np.ndarray, scores: np.ndarray, n_gt: int) -> float:
+    """All-point interpolated AP of one class."""
+    if n_gt == 0:
+        return float("nan")
+    if len(tp) == 0:
+        return 0.0
+    order = np.argsort(-scores, kind="stable")
+    tp = tp[order]
+    tp_cum = np.cumsum(tp)
+    recall = np.concatenate([[0.0], tp_cum / n_gt, [1.0]])
+    precision = np.concatenate([[1.0], tp_cum / np.arange(1, len(tp) + 1), [0.0]])
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    return float(np.sum(np.diff(recall) * precision[1:]))
+
+
+class DetectionEvaluator:
+    """Accumulates per-image predictions and ground truth."""
+
+    def __init__(self):
+        self.images = []
+
+    def add(self, pred_xyxy, pred_scores, pred_cls, gt_xyxy, gt_cls):
+        self.images.append(tuple(np.asarray(a) for a in (pred_xyxy, pred_scores, pred_cls, gt_xyxy, gt_cls)))
+
+    def _class_ap(self, iou_threshold: float) -> dict:
+        per_class = {}
+        for pred_xyxy, scores, pred_cls, gt_xyxy, gt_cls in self.images:
+            tp = match_predictions(pred_xyxy, scores, pred_cls, gt_xyxy, gt_cls, iou_threshold)
+            for cls in set(pred_cls.tolist()) | set(gt_cls.tolist()):
+                entry = per_class.setdefault(cls, [[], [], 0])
+                mask = pred_cls == cls
+                entry[0].append(tp[mask])
+                entry[1].append(scores[mask])
+                entry[2] += int(np.sum(gt_cls == cls))
+        return {
+            cls: average_precision(np.concatenate(tps), np.concatenate(scs), n_gt)
+            for cls, (tps, scs, n_gt) in per_class.items()
+        }
+
+    def summary(self) -> dict:
+        tp = n_pred = n_gt = 0
+        for pred_xyxy, scores, pred_cls, gt_xyxy, gt_cls in self.images:
+            tp += int(match_predictions(pred_xyxy, scores, pred_cls, gt_xyxy, gt_cls, 0.5).sum())
+            n_pred += len(pred_xyxy)
+            n_gt += len(gt_xyxy)
+
+        ap50 = self._class_ap(0.5)
+        maps = [np.nanmean(list(self._class_ap(t).values()) or [np.nan]) for t in MAP_IOU_THRESHOLDS]
+        return {
+            "images": len(self.images),
+            "predictions": n_pred,
+            "ground_truth": n_gt,
+            "precision": round(tp / n_pred, 4) if n_pred else None,
+            "recall": round(tp / n_gt, 4) if n_gt else None,
+            "map50": _round(np.nanmean(list(ap50.values()) or [np.nan])),
+            "map50_95": _round(np.nanmean(maps)),
+            "ap50_per_class": {str(c): _round(v) for c, v in sorted(ap50.items())},
+        }
+
+
+def _round(value):
+    return None if value is None or np.isnan(value) else round(float(value), 4)
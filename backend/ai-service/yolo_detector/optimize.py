@@ -0,0 +1,247 @@
+"""Optimized variants of the detector's ONNX model.
+
+``inference`` runs the Roboflow weights (``weights.onnx``) in an onnxruntime
+session. This module builds derived versions of that file and swaps them
+into the loaded model:
+
+* ``graph``: onnxruntime's full graph optimizations (constant folding,
+  operator fusion, CPU layout transforms), applied once and serialized, so
+  sessions skip that work at load. The result is tied to the CPU it was
+  built on.
+* ``int8``: INT8 quantization. Activations are calibrated on a few images
+  from MODEL_CALIBRATION_DIR (static QDQ) when set; otherwise only weights
+  are quantized (dynamic).
+* ``fp16``: float16 weights and activations, with float32 inputs and
+  outputs. This halves the file, but most CPUs lack fp16 kernels, so it is
+  usually slower there. It is meant for execution providers with fp16
+  support.
+
+Variants are stored under ``<MODEL_CACHE_DIR>/optimized/``, keyed by the
+model id, a hash of the source weights, the variant and its settings, the
+onnxruntime version and the CPU's instruction-set features. Changing any of
+these builds a fresh variant instead of reusing a stale one. Builds take a
+file lock, so worker processes starting together build once.
+
+Compare accuracy and latency of the variants with
+``benchmarks/bench_variants.py``.
+"""
+import fcntl
+import glob
+import hashlib
+import json
+import os
+import platform
+import re
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+VARIANTS = ("stock", "graph", "int8", "fp16")
+# Bump when a builder changes, so cached variants are rebuilt
+BUILD_VERSION = 1
+CALIBRATION_IMAGES = 64
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+# Instruction-set flags that change which kernels onnxruntime selects
+CPU_FEATURES = {
+    "sse4_1", "sse4_2", "avx", "avx2", "fma", "f16c",
+    "avx512f", "avx512bw", "avx512vl", "avx512_vnni", "avx512_bf16", "avx512_fp16",
+    "avx_vnni", "amx_tile", "amx_int8", "amx_bf16",
+    "asimd", "asimddp", "asimdhp", "fphp", "i8mm", "bf16", "sve", "sve2",
+}
+
+
+def cpu_features() -> list:
+    features = set()
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key.strip() in ("flags", "Features"):
+                    features.update(value.split())
+    except OSError:
+        pass
+    return [platform.machine()] + sorted(features & CPU_FEATURES)
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def calibration_images(calibration_dir: str, limit: int = CALIBRATION_IMAGES) -> list:
+    if not calibration_dir:
+        return []
+    paths = sorted(
+        p for p in glob.glob(os.path.join(calibration_dir, "**", "*"), recursive=True)
+        if os.path.splitext(p)[1].lower() in IMAGE_EXTENSIONS
+    )
+    return paths[:limit]
+
+
+def variant_settings(variant: str, calibration: list = ()) -> dict:
+    if variant == "graph":
+        return {"level": "ORT_ENABLE_ALL"}
+    if variant == "int8":
+        if calibration:
+            listing = "\n".join(f"{os.path.basename(p)}:{os.path.getsize(p)}" for p in calibration)
+            return {
+                "mode": "static", "format": "QDQ", "weights": "QInt8", "activations": "QUInt8",
+                "per_channel": True, "calibration": hashlib.sha256(listing.encode()).hexdigest()[:16],
+            }
+        return {"mode": "dynamic", "weights": "QUInt8"}
+    if variant == "fp16":
+        return {"keep_io_types": True}
+    raise ValueError(f"Unknown model variant {variant!r}, expected one of {', '.join(VARIANTS)}")
+
+
+def variant_key(model_id: str, source_digest: str, variant: str, settings: dict) -> tuple:
+    """``(hex digest, spec)`` identifying a built variant."""
+    import onnxruntime
+
+    spec = {
+        "build": BUILD_VERSION,
+        "model": model_id,
+        "source": source_digest,
+        "variant": variant,
+        "settings": settings,
+        "onnxruntime": onnxruntime.__version__,
+        "cpu": cpu_features(),
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest(), spec
+
+
+@contextmanager
+def _file_lock(path: str):
+    with open(path, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _build_graph(source: str, target: str, settings: dict, calibration_reader):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.optimized_model_filepath = target
+    ort.InferenceSession(source, options, providers=["CPUExecutionProvider"])
+
+
+def _build_int8(source: str, target: str, settings: dict, calibration_reader):
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+    if settings["mode"] == "static":
+        quantize_static(
+            source, target, calibration_reader,
+            quant_format=QuantFormat.QDQ,
+            weight_type=QuantType.QInt8,
+            activation_type=QuantType.QUInt8,
+            per_channel=True,
+        )
+    else:
+        quantize_dynamic(source, target, weight_type=QuantType.QUInt8)
+
+
+def _build_fp16(source: str, target: str, settings: dict, calibration_reader):
+    import onnx
+    from onnxruntime.transformers.float16 import convert_float_to_float16
+
+    model = onnx.load(source)
+    onnx.save(convert_float_to_float16(model, keep_io_types=True), target)
+
+
+BUILDERS = {"graph": _build_graph, "int8": _build_int8, "fp16": _build_fp16}
+
+
+def _calibration_reader(input_name: str, paths: list, preprocess):
+    import cv2
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class ImageReader(CalibrationDataReader):
+        def __init__(self):
+            self._paths = iter(paths)
+
+        def get_next(self):
+            for path in self._paths:
+                image = cv2.imread(path)
+                if image is not None:
+                    return {input_name: preprocess(image)}
+            return None
+
+    return ImageReader()
+
+
+def ensure_variant(source: str, model_id: str, variant: str, cache_dir: str,
+                   input_name: str = None, preprocess=None, calibration_dir: str = None) -> str:
+    """Path of the ``variant`` of ``source``, building it on first use.
+
+    ``preprocess(image) -> tensor`` and ``input_name`` feed calibration
+    images to static INT8 quantization.
+    """
+    calibration = calibration_images(calibration_dir) if variant == "int8" and preprocess else []
+    settings = variant_settings(variant, calibration)
+    key, spec = variant_key(model_id, _file_digest(source), variant, settings)
+    root = os.path.join(cache_dir, "optimized")
+    name = re.sub(r"[^A-Za-z0-9_.-]+", "-", model_id)
+    target_dir = os.path.join(root, f"{name}-{variant}-{key[:16]}")
+    path = os.path.join(target_dir, "model.onnx")
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(root, exist_ok=True)
+    with _file_lock(target_dir + ".lock"):
+        if os.path.exists(path):
+            return path
+        build_dir = tempfile.mkdtemp(prefix=".build-", dir=root)
+        try:
+            start = time.perf_counter()
+            reader = _calibration_reader(input_name, calibration, preprocess) if calibration else None
+            BUILDERS[variant](source, os.path.join(build_dir, "model.onnx"), settings, reader)
+            spec["build_s"] = round(time.perf_counter() - start, 2)
+            spec["source_bytes"] = os.path.getsize(source)
+            spec["bytes"] = os.path.getsize(os.path.join(build_dir, "model.onnx"))
+            with open(os.path.join(build_dir, "meta.json"), "w") as f:
+                json.dump(spec, f, indent=2)
+            # Publish atomically: readers see either no variant or a complete one
+            os.replace(build_dir, target_dir)
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+    return path
+
+
+def apply_variant(model, variant: str, cache_dir: str, calibration_dir: str = None) -> str:
+    """Swap the ONNX session of an ``inference`` model for ``variant``.
+
+    Returns the path of the weights now in use. The original session is
+    kept, so applying ``"stock"`` restores it.
+    """
+    import onnxruntime as ort
+
+    stock = getattr(model, "_stock_onnx_session", None) or getattr(model, "onnx_session", None)
+    if stock is None:
+        raise RuntimeError(f"{type(model).__name__} does not expose an ONNX session")
+    model._stock_onnx_session = stock
+    source = model.cache_file(model.weights_file)
+    if variant == "stock":
+        model.onnx_session = stock
+        return source
+
+    path = ensure_variant(
+        source, model.endpoint, variant, cache_dir,
+        input_name=model.input_name,
+        preprocess=lambda image: model.preprocess(image)[0],
+        calibration_dir=calibration_dir,
+    )
+    options = stock.get_session_options()
+    if variant == "graph":
+        # Already optimized offline; skip the load-time passes
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+    model.onnx_session = ort.InferenceSession(path, options, providers=stock.get_providers())
+    return path
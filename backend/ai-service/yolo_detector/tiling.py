@@ -0,0 +1,180 @@
+"""Sliced (tiled) inference for high-resolution images.
+
+The image is cut into overlapping tiles that are views into the decoded
+array (no copies), each tile is inferred at the network resolution, the
+boxes are shifted back to image coordinates and duplicates across tile
+borders are removed with class-aware NMS.
+
+The merge measures overlap as intersection over the smaller box rather than
+IoU: a box cut off at a tile edge (say 150 px of a 400 px object) lies
+inside the full-object box from a neighbouring tile or the whole-image pass,
+but their IoU is well under any usable threshold. Boxes touching an interior
+tile border rank below untouched ones, so the complete box is the one kept
+and a cut-off box only survives when nothing else covers the object.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import supervision as sv
+
+# Boxes within this many pixels of a tile edge count as cut off by it
+BORDER_MARGIN = 2.0
+
+
+@lru_cache(maxsize=None)
+def _get_executor(workers: int) -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tile")
+
+
+def _axis_origins(length: int, tile: int, stride: int) -> list:
+    if length <= tile:
+        return [0]
+    origins = list(range(0, length - tile, stride))
+    # Last tile is aligned to the border so the whole image is covered
+    origins.append(length - tile)
+    return origins
+
+
+def tile_origins(height: int, width: int, tile_size: int, overlap: float) -> list:
+    """Top-left ``(x, y)`` of every tile covering a ``height`` x ``width`` image."""
+    if not 0 <= overlap < 1:
+        raise ValueError("overlap must be in [0, 1)")
+    stride = max(1, int(tile_size * (1 - overlap)))
+    return [
+        (x, y)
+        for y in _axis_origins(height, tile_size, stride)
+        for x in _axis_origins(width, tile_size, stride)
+    ]
+
+
+def slice_image(image: np.ndarray, tile_size: int, overlap: float):
+    """Return ``(tiles, origins)``; tiles are views into ``image``."""
+    height, width = image.shape[:2]
+    origins = tile_origins(height, width, tile_size, overlap)
+    tiles = [image[y:y + tile_size, x:x + tile_size] for x, y in origins]
+    return tiles, origins
+
+
+def box_iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU matrix between two ``(N, 4)`` / ``(M, 4)`` xyxy arrays."""
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    wh = np.clip(bottom_right - top_left, 0, None)
+    inter = wh[..., 0] * wh[..., 1]
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter, dtype=np.float64), where=union > 0)
+
+
+def box_ios(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise intersection over the smaller of the two boxes."""
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    wh = np.clip(bottom_right - top_left, 0, None)
+    inter = wh[..., 0] * wh[..., 1]
+    smaller = np.minimum(area_a[:, None], area_b[None, :])
+    return np.divide(inter, smaller, out=np.zeros_like(inter, dtype=np.float64), where=smaller > 0)
+
+
+MATCH_METRICS = {"iou": box_iou, "ios": box_ios}
+
+
+def _greedy_nms(xyxy: np.ndarray, scores: np.ndarray, iou_threshold: float,
+                metric: str = "iou", rank: np.ndarray = None) -> np.ndarray:
+    # Lower rank first, then higher score
+    order = np.argsort(-scores, kind="stable") if rank is None else np.lexsort((-scores, rank))
+    boxes = xyxy[order].astype(np.float64)
+    suppress = np.triu(MATCH_METRICS[metric](boxes, boxes) > iou_threshold, k=1)
+    keep = np.ones(len(order), dtype=bool)
+    for i in range(len(order)):
+        if keep[i]:
+            keep[suppress[i]] = False
+    return order[keep]
+
+
+def nms(xyxy: np.ndarray, scores: np.ndarray, class_id: np.ndarray = None,
+        iou_threshold: float = 0.5, metric: str = "iou", rank: np.ndarray = None) -> np.ndarray:
+    """Greedy non-maximum suppression, returns the indices to keep.
+
+    Runs per class, so boxes of different classes never suppress each other
+    and each IoU matrix only covers one class. ``metric`` is ``"iou"`` or
+    ``"ios"`` (intersection over the smaller box). Boxes with a lower
+    ``rank`` are kept in preference to higher-scored ones with a higher rank.
+    """
+    if len(xyxy) == 0:
+        return np.empty(0, dtype=int)
+    if class_id is None:
+        return _greedy_nms(xyxy, scores, iou_threshold, metric, rank)
+    class_id = np.asarray(class_id)
+    keep = []
+    for cls in np.unique(class_id):
+        index = np.flatnonzero(class_id == cls)
+        keep.append(index[_greedy_nms(
+            xyxy[index], scores[index], iou_threshold, metric, None if rank is None else rank[index])])
+    return np.concatenate(keep)
+
+
+def _offset(detections: sv.Detections, x: int, y: int) -> sv.Detections:
+    if len(detections):
+        detections.xyxy = detections.xyxy + np.array([x, y, x, y], dtype=detections.xyxy.dtype)
+    return detections
+
+
+def touches_interior_border(xyxy: np.ndarray, tile: tuple, image_size: tuple,
+                            margin: float = BORDER_MARGIN) -> np.ndarray:
+    """Which boxes (image coordinates) reach an edge of ``tile`` that is not an image edge.
+
+    ``tile`` is ``(x, y, width, height)``, ``image_size`` is ``(width, height)``.
+    """
+    x, y, w, h = tile
+    width, height = image_size
+    return (
+        ((x > 0) & (xyxy[:, 0] <= x + margin))
+        | ((y > 0) & (xyxy[:, 1] <= y + margin))
+        | ((x + w < width) & (xyxy[:, 2] >= x + w - margin))
+        | ((y + h < height) & (xyxy[:, 3] >= y + h - margin))
+    )
+
+
+def infer_tiled(model, image: np.ndarray, tile_size: int = 640, overlap: float = 0.2,
+                workers: int = 4, batch: bool = False, include_full: bool = True,
+                iou_threshold: float = 0.5) -> sv.Detections:
+    """Run ``model`` over overlapping tiles of ``image`` and merge the boxes.
+
+    Tiles are inferred as a single batch when ``batch`` is set, otherwise in
+    parallel on a shared thread pool. ``include_full`` adds a regular
+    whole-image pass so large objects split across tiles are still found.
+    Overlapping boxes of a class are merged when their intersection covers
+    more than ``iou_threshold`` of the smaller one.
+    """
+    tiles, origins = slice_image(image, tile_size, overlap)
+    if include_full and len(tiles) > 1:
+        tiles.append(image)
+        origins.append((0, 0))
+
+    if batch:
+        results = model.infer(tiles)
+    else:
+        results = list(_get_executor(workers).map(lambda tile: model.infer(tile)[0], tiles))
+
+    height, width = image.shape[:2]
+    per_tile, cut = [], []
+    for result, tile, (x, y) in zip(results, tiles, origins):
+        found = _offset(sv.Detections.from_inference(result), x, y)
+        per_tile.append(found)
+        cut.append(touches_interior_border(
+            found.xyxy, (x, y, tile.shape[1], tile.shape[0]), (width, height)))
+    detections = sv.Detections.merge(per_tile)
+    if len(detections) == 0:
+        return detections
+
+    scores = detections.confidence
+    if scores is None:
+        scores = np.ones(len(detections))
+    rank = np.concatenate(cut).astype(int)
+    keep = nms(detections.xyxy, scores, detections.class_id, iou_threshold, metric="ios", rank=rank)
+    return detections[np.sort(keep)]
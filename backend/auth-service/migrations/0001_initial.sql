@@ -0,0 +1,36 @@
+-- Baseline schema (formerly backend/db/init.sql). IF NOT EXISTS keeps it a
+-- no-op on databases created from init.sql or by create_all.
+
+CREATE TABLE IF NOT EXISTS users (
+  id SERIAL PRIMARY KEY,
+  username VARCHAR(50) UNIQUE NOT NULL,
+  email VARCHAR(100) UNIQUE NOT NULL,
+  password_hash TEXT,
+  email_verified BOOLEAN DEFAULT FALSE,
+  provider VARCHAR(50) NOT NULL,
+  provider_id VARCHAR(100),
+  last_login TIMESTAMP,
+  created_at TIMESTAMP DEFAULT NOW(),
+  UNIQUE (provider, provider_id)
+);
+
+CREATE TABLE IF NOT EXISTS detects (
+  id SERIAL PRIMARY KEY,
+  user_id INT REFERENCES users(id) ON DELETE CASCADE,
+  image BYTEA NOT NULL,
+  image_mime_type VARCHAR(50),
+  detected_ingredients TEXT[],
+  recommendation TEXT,
+  created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Per-user history export pages by (user_id, id)
+CREATE INDEX IF NOT EXISTS ix_detects_user_id_id ON detects (user_id, id);
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+  jti VARCHAR(64) PRIMARY KEY,
+  expires_at TIMESTAMP NOT NULL,
+  revoked_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS ix_revoked_tokens_revoked_at ON revoked_tokens (revoked_at);
@@ -0,0 +1,5 @@
+-- Distinguish revocations (mirrored in every worker's memory) from spent
+-- single-use refresh tokens (checked in the database only). Existing rows
+-- are treated as revocations.
+
+ALTER TABLE revoked_tokens ADD COLUMN IF NOT EXISTS kind VARCHAR(16) NOT NULL DEFAULT 'revoked';
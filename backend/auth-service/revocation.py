@@ -0,0 +1,146 @@
+"""Token revocation store.
+
+Revoked token ids (``jti``) are persisted in the ``revoked_tokens`` table and
+mirrored in memory, so checking a token on the verify path is a dict lookup
+with no database round trip. Each worker keeps its copy up to date by
+periodically pulling the rows revoked since its last sync, and drops entries
+once the token they revoke has expired anyway.
+
+Spent single-use refresh tokens share the table (``kind = 'spent'``) but are
+never loaded into memory: there is one per refresh, and refresh tokens are
+checked against the database anyway.
+"""
+import calendar
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+# revoked_at is the revoking transaction's start time, so a row can commit
+# slightly after a sync has passed its timestamp; re-read a short window
+SYNC_OVERLAP = timedelta(seconds=30)
+PURGE_INTERVAL = 3600.0
+KIND_REVOKED = "revoked"
+KIND_SPENT = "spent"
+
+
+def _epoch(dt: datetime) -> float:
+    # Timestamps are naive UTC throughout the service
+    return calendar.timegm(dt.utctimetuple())
+
+
+class RevocationStore:
+    def __init__(self, session_factory, model, sync_interval: float = 5.0):
+        self.session_factory = session_factory
+        self.model = model
+        self.sync_interval = sync_interval
+        self._expires = {}  # jti -> expiry (unix seconds)
+        self._heap = []  # (expiry, jti) for eviction
+        self._lock = threading.Lock()
+        self._watermark = None  # latest revoked_at seen, database clock
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._expires)
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti is not None and jti in self._expires
+
+    def _add(self, jti: str, expires: float):
+        with self._lock:
+            if jti not in self._expires:
+                self._expires[jti] = expires
+                heapq.heappush(self._heap, (expires, jti))
+
+    def revoke(self, db, jti: str, expires_at: datetime):
+        """Persist a revocation and apply it locally right away."""
+        if not jti:
+            return
+        db.merge(self.model(jti=jti, expires_at=expires_at, kind=KIND_REVOKED))
+        db.commit()
+        self._add(jti, _epoch(expires_at))
+
+    def consume(self, db, jti: str, expires_at: datetime) -> bool:
+        """Record a single-use token as spent; ``False`` if it already was.
+
+        The primary key makes this atomic across workers and replicas, unlike
+        the in-memory set, which lags by up to one sync interval. Spent ids
+        stay in the database only.
+        """
+        db.add(self.model(jti=jti, expires_at=expires_at, kind=KIND_SPENT))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return False
+        return True
+
+    def evict_expired(self, now: float = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, jti = heapq.heappop(self._heap)
+                self._expires.pop(jti, None)
+
+    def sync(self):
+        """Pull revocations made since the last sync (by any worker)."""
+        model = self.model
+        db = self.session_factory()
+        try:
+            if self._watermark is None:
+                # Full load of live revocations; later syncs fetch rows revoked
+                # after this point, compared on the database clock
+                watermark = db.query(func.localtimestamp()).scalar()
+                rows = db.query(model.jti, model.expires_at, model.revoked_at) \
+                    .filter(model.kind == KIND_REVOKED, model.expires_at > datetime.utcnow()).all()
+            else:
+                watermark = self._watermark
+                rows = db.query(model.jti, model.expires_at, model.revoked_at) \
+                    .filter(model.kind == KIND_REVOKED, model.revoked_at >= self._watermark - SYNC_OVERLAP).all()
+        finally:
+            db.close()
+
+        for jti, expires_at, revoked_at in rows:
+            self._add(jti, _epoch(expires_at))
+            if revoked_at is not None and revoked_at > watermark:
+                watermark = revoked_at
+        self._watermark = watermark
+        self.evict_expired()
+
+    def purge_expired_rows(self):
+        """Delete database rows of tokens that have expired."""
+        db = self.session_factory()
+        try:
+            db.query(self.model).filter(self.model.expires_at <= datetime.utcnow()).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    def _run(self):
+        last_purge = time.monotonic()
+        while not self._stop.wait(self.sync_interval):
+            try:
+                self.sync()
+                if time.monotonic() - last_purge >= PURGE_INTERVAL:
+                    self.purge_expired_rows()
+                    last_purge = time.monotonic()
+            except Exception as e:
+                logger.warning("Revocation sync failed: %s", e)
+
+    def start(self):
+        try:
+            self.sync()
+        except Exception as e:
+            logger.warning("Initial revocation sync failed: %s", e)
+        self._thread = threading.Thread(target=self._run, name="revocation-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -8,6 +8,7 @@ import {
 } from "./authContext";
 import useFetch from "./useFetch.js";
 import {
+  getFreshTokens,
   getTokensInfo,
   setTokensInfo as setTokensInfoToStorage,
 } from "./token.js";
@@ -41,11 +42,23 @@ function AuthProvider(props) {
   }, []);
 
   const logOut = useCallback(async () => {
-    const tokens = getTokensInfo();
+    let tokens = getTokensInfo();
+
+    if (tokens?.token) {
+      // Refresh (if due) before reading the refresh token for the body, so
+      // logout revokes the token that is current afterwards, not a spent one
+      try {
+        tokens = await getFreshTokens();
+      } catch {
+        // Session already expired; nothing left to revoke
+        tokens = null;
+      }
+    }
 
     if (tokens?.token) {
       await fetchBase("/auth/logout", {
         method: "POST",
+        body: JSON.stringify({ refresh_token: tokens.refreshToken }),
       });
     }
     setTokensInfo(null);
@@ -14,4 +14,45 @@ export function setTokensInfo(tokens) {
   } else {
     Cookies.remove('auth-token-data');
   }
-}
\ No newline at end of file
+}
+
+// Refresh tokens are single-use: concurrent callers must share one refresh,
+// or every request after the first would present a spent token and get 401
+let refreshing = null;
+
+async function refreshTokens(refreshToken) {
+  const res = await fetch("/auth/refresh", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ refresh_token: refreshToken }),
+  });
+
+  if (!res.ok) {
+    setTokensInfo(null);
+    throw new Error("Session expired");
+  }
+
+  const newTokens = await res.json();
+  const tokens = {
+    token: newTokens.access_token,
+    refreshToken: newTokens.refresh_token,
+    tokenExpires: newTokens.expires_at,
+  };
+  setTokensInfo(tokens);
+  return tokens;
+}
+
+// Current tokens, refreshed first if the access token expires within a minute
+export async function getFreshTokens() {
+  const tokens = getTokensInfo();
+  if (!tokens?.tokenExpires || tokens.tokenExpires - 60000 > Date.now()) {
+    return tokens;
+  }
+
+  if (!refreshing) {
+    refreshing = refreshTokens(tokens.refreshToken).finally(() => {
+      refreshing = null;
+    });
+  }
+  return refreshing;
+}
@@ -1,35 +1,14 @@
 "use client";
 
 import { useCallback } from "react";
-import { getTokensInfo, setTokensInfo } from "./token";
+import { getFreshTokens, setTokensInfo } from "./token";
 
 async function fetchWithAuth(url, options = {}) {
-  let tokens = getTokensInfo();
+  const tokens = await getFreshTokens();
 
   const headers = new Headers(options.headers || {});
   headers.set("Content-Type", "application/json");
 
-  if (tokens?.tokenExpires && tokens.tokenExpires - 60000 <= Date.now()) {
-    const res = await fetch(`/auth/refresh`, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ refresh_token: tokens.refreshToken }),
-    });
-
-    if (res.ok) {
-      const newTokens = await res.json();
-      tokens = {
-        token: newTokens.access_token,
-        refreshToken: newTokens.refresh_token,
-        tokenExpires: newTokens.expires_at,
-      };
-      setTokensInfo(tokens);
-    } else {
-      setTokensInfo(null);
-      throw new Error("Session expired");
-    }
-  }
-
   if (tokens?.token) {
     headers.set("Authorization", `Bearer ${tokens.token}`);
   }